@@ -1,15 +1,41 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, Header, Query, Request, UploadFile, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, DeleteOne, IndexModel, ReplaceOne, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 import os
+import sys
+import argparse
+import base64
+import bson
+import csv
+import hashlib
+import hmac
+import io
+import json
+import re
+import asyncio
+import queue as queue_module
+import smtplib
+import contextvars
 import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, ValidationError
+from typing import List, Literal, Optional
 import uuid
-from datetime import datetime, timedelta
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from email.header import Header as EmailHeader
+from email.mime.text import MIMEText
 import jwt
 from passlib.context import CryptContext
 # Email imports removed - using basic print for notifications
@@ -17,17 +43,318 @@ from passlib.context import CryptContext
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Request instrumentation settings (0 disables the slow-request log)
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # /metrics is disabled unless a token is configured
+
+# Metrics
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+class Metrics:
+    """Small in-process metrics registry rendered in the Prometheus text format."""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.gauges = defaultdict(float)
+        self.histograms = {}
+        # Mongo command events arrive on Motor's executor threads
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        with self._lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def add(self, name: str, delta: float, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] += delta
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": [0] * len(self.BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def render(self) -> str:
+        lines = []
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted((key, dict(value, buckets=list(value["buckets"]))) for key, value in self.histograms.items())
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            declare(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            declare(name, "histogram")
+            for bound, count in zip(self.BUCKETS, histogram["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+# Mongo commands issued while handling the current request, for the slow-request log
+request_mongo_commands = contextvars.ContextVar("request_mongo_commands", default=None)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every Mongo command by collection and operation."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get("collection", "")  # getMore names it separately
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _finished(self, event, failed: bool):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        seconds = event.duration_micros / 1e6
+        metrics.observe("mongo_command_seconds", seconds, collection=collection, command=event.command_name)
+        if failed:
+            metrics.inc("mongo_command_failures_total", collection=collection, command=event.command_name)
+        commands = request_mongo_commands.get()
+        if commands is not None:
+            commands.append(f"{event.command_name} {collection} {seconds * 1000:.1f}ms")
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandListener()])
 db = client[os.environ['DB_NAME']]
+MONGO_TRANSACTIONS = os.environ.get('MONGO_TRANSACTIONS', 'auto')  # "auto" detects support, "off" never tries
 
 # JWT and Password settings
 SECRET_KEY = "your-secret-key-here"
 ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', '15'))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get('REFRESH_TOKEN_EXPIRE_DAYS', '30'))
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = int(os.environ.get('REFRESH_TOKEN_REUSE_GRACE_SECONDS', '30'))
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# Password hashing pool settings
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', '64'))
+PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')  # "thread" or "process"
+PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', '1'))
+
+# Authenticated principal cache settings (size 0 disables the cache)
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', '60'))
+
+# Token verification settings
+AUTH_MODE = os.environ.get('AUTH_MODE', 'lookup')  # "lookup" loads the user per request, "claims" trusts the signed token
+TOKEN_VERSION_REFRESH_SECONDS = float(os.environ.get('TOKEN_VERSION_REFRESH_SECONDS', '30'))
+
+# Serialize list responses straight from Mongo documents with orjson instead of
+# validating each document through its Pydantic model first
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', '1') == '1'
+
+# Parent/student relation cache settings (size 0 disables the cache)
+RELATION_CACHE_SIZE = int(os.environ.get('RELATION_CACHE_SIZE', '10000'))
+RELATION_CACHE_TTL = float(os.environ.get('RELATION_CACHE_TTL', '30'))
+
+# List pagination settings
+LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', '100'))
+LIST_PAGE_SIZE_MAX = int(os.environ.get('LIST_PAGE_SIZE_MAX', '1000'))
+
+# Notification dispatch settings
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', '2'))
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', '100'))
+NOTIFICATION_SWEEP_INTERVAL = float(os.environ.get('NOTIFICATION_SWEEP_INTERVAL', '5'))
+NOTIFICATION_LEASE_SECONDS = int(os.environ.get('NOTIFICATION_LEASE_SECONDS', '60'))
+NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS', '5'))  # then the entry is marked failed
+NOTIFICATION_OUTBOX_RETENTION_SECONDS = int(os.environ.get('NOTIFICATION_OUTBOX_RETENTION_SECONDS', '86400'))
+# Notification retention settings. Read notifications expire through a TTL index unless
+# NOTIFICATION_ARCHIVE=1, in which case the retention job moves them to notifications_archive
+# (switching modes on an existing database needs the read_at index dropped first)
+NOTIFICATION_READ_RETENTION_SECONDS = int(os.environ.get('NOTIFICATION_READ_RETENTION_SECONDS', str(30 * 86400)))
+NOTIFICATION_UNREAD_CAP = int(os.environ.get('NOTIFICATION_UNREAD_CAP', '1000'))
+NOTIFICATION_ARCHIVE = os.environ.get('NOTIFICATION_ARCHIVE', '0') == '1'
+NOTIFICATION_ARCHIVE_RETENTION_SECONDS = int(os.environ.get('NOTIFICATION_ARCHIVE_RETENTION_SECONDS', str(365 * 86400)))
+NOTIFICATION_RETENTION_INTERVAL_SECONDS = int(os.environ.get('NOTIFICATION_RETENTION_INTERVAL_SECONDS', '3600'))
+NOTIFICATION_RETENTION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_RETENTION_BATCH_SIZE', '1000'))
+
+# Parent digest settings (parents choose immediate, hourly or daily delivery)
+DIGEST_INTERVAL_SECONDS = float(os.environ.get('DIGEST_INTERVAL_SECONDS', '300'))
+DIGEST_MAX_LINES = int(os.environ.get('DIGEST_MAX_LINES', '20'))
+
+# Email delivery settings
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'console')  # "console" or "smtp"
+EMAIL_FROM = os.environ.get('EMAIL_FROM', 'no-reply@schoolwork.local')
+SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '25'))
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', '0') == '1'
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', '10'))
+EMAIL_CONCURRENCY = int(os.environ.get('EMAIL_CONCURRENCY', '10'))  # sender workers and pooled connections
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', '50'))  # messages sent per connection checkout
+EMAIL_BATCH_WAIT = float(os.environ.get('EMAIL_BATCH_WAIT', '0.05'))
+EMAIL_MAX_RETRIES = int(os.environ.get('EMAIL_MAX_RETRIES', '3'))
+EMAIL_RETRY_BACKOFF = float(os.environ.get('EMAIL_RETRY_BACKOFF', '0.5'))
+
+# Roster import settings (the bulk endpoints are disabled unless a key is configured)
+ROSTER_IMPORT_KEY = os.environ.get('ROSTER_IMPORT_KEY')
+ROSTER_BATCH_SIZE = int(os.environ.get('ROSTER_BATCH_SIZE', '200'))
+
+# Push channel settings
+PUSH_BACKEND = os.environ.get('PUSH_BACKEND', 'local')  # "local" or "mongo" (change streams, needs a replica set)
+PUSH_QUEUE_SIZE = int(os.environ.get('PUSH_QUEUE_SIZE', '100'))
+PUSH_KEEPALIVE_SECONDS = float(os.environ.get('PUSH_KEEPALIVE_SECONDS', '15'))
+PUSH_EVENT_RETENTION_SECONDS = int(os.environ.get('PUSH_EVENT_RETENTION_SECONDS', '60'))
+PUSH_TICKET_SECONDS = int(os.environ.get('PUSH_TICKET_SECONDS', '30'))
+
+# Maximum number of operations accepted by one task batch request
+TASK_BATCH_MAX = int(os.environ.get('TASK_BATCH_MAX', '500'))
+
+# Project task limits; fields are bounded so every document stays within the byte budget
+PROJECT_TASK_TITLE_MAX = int(os.environ.get('PROJECT_TASK_TITLE_MAX', '200'))
+PROJECT_TASK_DESCRIPTION_MAX = int(os.environ.get('PROJECT_TASK_DESCRIPTION_MAX', '3500'))
+PROJECT_TASK_MAX_BYTES = int(os.environ.get('PROJECT_TASK_MAX_BYTES', '16384'))
+
+# Due-date reminder settings (interval 0 disables the scheduler)
+REMINDER_INTERVAL_SECONDS = float(os.environ.get('REMINDER_INTERVAL_SECONDS', '300'))
+REMINDER_LEASE_SECONDS = int(os.environ.get('REMINDER_LEASE_SECONDS', '900'))
+REMINDER_DUE_SOON_HOURS = float(os.environ.get('REMINDER_DUE_SOON_HOURS', '24'))
+REMINDER_BUCKET_MINUTES = float(os.environ.get('REMINDER_BUCKET_MINUTES', '60'))
+REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', '500'))
+
+# Indexes required by the API's queries, declared per collection
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("token_version", ASCENDING)], sparse=True),
+    ],
+    "tasks": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("student_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("student_id", ASCENDING), ("completed", ASCENDING), ("due_date", ASCENDING)]),
+        IndexModel([("completed", ASCENDING), ("due_date", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("due_date_changed_at", ASCENDING)]),
+    ],
+    "subjects": [
+        IndexModel([("student_id", ASCENDING)]),
+    ],
+    "projects": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("student_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "project_tasks": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("project_id", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "parent_student_relations": [
+        IndexModel([("parent_id", ASCENDING), ("student_id", ASCENDING)]),
+        IndexModel([("student_id", ASCENDING)]),
+    ],
+    "parent_invites": [
+        IndexModel([("invite_code", ASCENDING)], unique=True),
+    ],
+    "notifications": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("read", ASCENDING), ("user_id", ASCENDING)]),
+        IndexModel(
+            [("read_at", ASCENDING)],
+            partialFilterExpression={"read": True},
+            **({} if NOTIFICATION_ARCHIVE or NOTIFICATION_READ_RETENTION_SECONDS <= 0
+               else {"expireAfterSeconds": NOTIFICATION_READ_RETENTION_SECONDS})
+        ),
+    ],
+    "notifications_archive": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        *([IndexModel([("archived_at", ASCENDING)], expireAfterSeconds=NOTIFICATION_ARCHIVE_RETENTION_SECONDS)]
+          if NOTIFICATION_ARCHIVE_RETENTION_SECONDS > 0 else []),
+    ],
+    "notification_outbox": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        IndexModel([("claim", ASCENDING)]),
+        IndexModel([("processed_at", ASCENDING)], expireAfterSeconds=NOTIFICATION_OUTBOX_RETENTION_SECONDS),
+    ],
+    "push_events": [
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=PUSH_EVENT_RETENTION_SECONDS),
+    ],
+    "notification_digests": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("frequency", ASCENDING), ("buffered_at", ASCENDING)]),
+    ],
+    "notification_counters": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("unread", ASCENDING)]),
+    ],
+    "student_stats": [
+        IndexModel([("student_id", ASCENDING)], unique=True),
+    ],
+    "refresh_tokens": [
+        IndexModel([("token_hash", ASCENDING)], unique=True),
+        IndexModel([("family_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+# Representative hot queries explained by --check-indexes
+HOT_QUERIES = [
+    ("users", {"email": "student@example.com"}, None),
+    ("users", {"id": "00000000"}, None),
+    ("tasks", {"student_id": "00000000"}, {"created_at": 1, "id": 1}),
+    ("tasks", {"id": "00000000", "student_id": "00000000"}, None),
+    ("tasks", {"student_id": {"$in": ["00000000"]}, "completed": False, "due_date": {"$lt": datetime(2000, 1, 1)}}, None),
+    ("tasks", {"completed": False, "due_date": {"$gt": datetime(2000, 1, 1), "$lte": datetime(2000, 1, 2)}}, {"due_date": 1, "id": 1}),
+    ("student_stats", {"student_id": {"$in": ["00000000"]}}, None),
+    ("subjects", {"student_id": "00000000"}, None),
+    ("projects", {"student_id": "00000000"}, {"created_at": 1, "id": 1}),
+    ("project_tasks", {"project_id": "00000000"}, None),
+    ("parent_student_relations", {"parent_id": "00000000"}, None),
+    ("parent_student_relations", {"student_id": "00000000"}, None),
+    ("parent_invites", {"invite_code": "00000000", "accepted": False}, None),
+    ("notifications", {"user_id": "00000000"}, {"created_at": -1, "id": -1}),
+]
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -43,6 +370,8 @@ class User(BaseModel):
     hashed_password: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
+    token_version: int = 0
+    notification_frequency: str = "immediate"  # parents only: immediate, hourly or daily
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -50,10 +379,16 @@ class UserCreate(BaseModel):
     password: str
     role: str
 
+class RosterImport(BaseModel):
+    users: List[UserCreate]
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class Subject(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -76,22 +411,37 @@ class Task(BaseModel):
     priority: str = "medium"  # low, medium, high
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
+    due_date_changed_at: Optional[datetime] = None  # lets the reminder scheduler rescan edited tasks
+
+# Subject ids double as field names in student_stats, so they must be plain path segments
+SUBJECT_ID_PATTERN = r"^[A-Za-z0-9_-]+$"
 
 class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
-    subject_id: str
+    subject_id: str = Field(pattern=SUBJECT_ID_PATTERN)
     due_date: Optional[datetime] = None
     priority: str = "medium"
 
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
-    subject_id: Optional[str] = None
+    subject_id: Optional[str] = Field(None, pattern=SUBJECT_ID_PATTERN)
     due_date: Optional[datetime] = None
     priority: Optional[str] = None
     completed: Optional[bool] = None
 
+class TaskBatchOperation(BaseModel):
+    id: str
+    op: Literal["complete", "reopen", "update", "delete"]
+    # Only used by "update"
+    subject_id: Optional[str] = Field(None, pattern=SUBJECT_ID_PATTERN)
+    due_date: Optional[datetime] = None
+    priority: Optional[str] = None
+
+class TaskBatch(BaseModel):
+    operations: List[TaskBatchOperation] = Field(min_length=1, max_length=TASK_BATCH_MAX)
+
 class Project(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -115,12 +465,35 @@ class ProjectTask(BaseModel):
     due_date: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+ProjectTaskStatus = Literal["todo", "in_progress", "done"]
+
 class ProjectTaskCreate(BaseModel):
-    title: str
-    description: Optional[str] = None
-    status: str = "todo"
+    title: str = Field(min_length=1, max_length=PROJECT_TASK_TITLE_MAX)
+    description: Optional[str] = Field(None, max_length=PROJECT_TASK_DESCRIPTION_MAX)
+    status: ProjectTaskStatus = "todo"
+    due_date: Optional[datetime] = None
+
+class ProjectTaskUpdate(BaseModel):
+    # Unknown fields are rejected so clients cannot grow documents with arbitrary keys
+    model_config = ConfigDict(extra="forbid")
+    
+    title: Optional[str] = Field(None, min_length=1, max_length=PROJECT_TASK_TITLE_MAX)
+    description: Optional[str] = Field(None, max_length=PROJECT_TASK_DESCRIPTION_MAX)
+    status: Optional[ProjectTaskStatus] = None
     due_date: Optional[datetime] = None
 
+def largest_project_task_size() -> int:
+    # Every field at its limit, with characters that take 4 bytes in UTF-8
+    task = ProjectTask(
+        title="\U0001F4DA" * PROJECT_TASK_TITLE_MAX,
+        description="\U0001F4DA" * PROJECT_TASK_DESCRIPTION_MAX,
+        project_id=str(uuid.uuid4()),
+        student_id=str(uuid.uuid4()),
+        status="in_progress",
+        due_date=datetime.utcnow()
+    )
+    return len(bson.encode(task.dict()))
+
 class ParentInvite(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     student_id: str
@@ -143,10 +516,120 @@ class Notification(BaseModel):
     user_id: str
     title: str
     message: str
-    type: str  # task_completed, task_due, parent_invite
+    type: str  # task_update, task_due, task_overdue, digest, parent_invite
     read: bool = False
+    read_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class NotificationPreferences(BaseModel):
+    notification_frequency: Literal["immediate", "hourly", "daily"]
+
+class NotificationReadRequest(BaseModel):
+    # Either explicit ids or everything created at or before a timestamp
+    ids: Optional[List[str]] = Field(None, max_length=LIST_PAGE_SIZE_MAX)
+    before: Optional[datetime] = None
+
+# Caches
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a fixed TTL."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                metrics.inc("cache_hits_total", cache=self.name)
+                return value
+            del self._data[key]
+        metrics.inc("cache_misses_total", cache=self.name)
+        return None
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        metrics.set("cache_entries", len(self._data), cache=self.name)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+class LocalCacheBackend:
+    """Per-process cache backend.
+
+    A shared backend (e.g. one backed by Redis) can replace it by providing
+    the same async get/set/delete methods.
+    """
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+
+    async def get(self, key):
+        return self.cache.get(key)
+
+    async def set(self, key, value):
+        self.cache.set(key, value)
+
+    async def delete(self, key):
+        self.cache.delete(key)
+
+principal_cache = LocalCacheBackend(TTLCache("principal", PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL))
+
+async def invalidate_principal(email: str):
+    # Call whenever a user record changes so the next request reloads it
+    await principal_cache.delete(email)
+
+# Relations only change when an invite is accepted, so both directions are cached
+students_by_parent_cache = TTLCache("students_by_parent", RELATION_CACHE_SIZE, RELATION_CACHE_TTL)
+parents_by_student_cache = TTLCache("parents_by_student", RELATION_CACHE_SIZE, RELATION_CACHE_TTL)
+
+async def get_parent_student_ids(parent_id: str) -> List[str]:
+    student_ids = students_by_parent_cache.get(parent_id)
+    if student_ids is None:
+        relations = await db.parent_student_relations.find({"parent_id": parent_id}, {"student_id": 1}).to_list(None)
+        student_ids = tuple(rel["student_id"] for rel in relations)
+        students_by_parent_cache.set(parent_id, student_ids)
+    return list(student_ids)
+
+async def get_parent_ids_by_student(student_ids: List[str]) -> dict:
+    result = {}
+    misses = []
+    for student_id in student_ids:
+        parent_ids = parents_by_student_cache.get(student_id)
+        if parent_ids is None:
+            misses.append(student_id)
+        else:
+            result[student_id] = list(parent_ids)
+    
+    if misses:
+        found = defaultdict(list)
+        relations = await db.parent_student_relations.find({"student_id": {"$in": misses}}, {"parent_id": 1, "student_id": 1}).to_list(None)
+        for rel in relations:
+            found[rel["student_id"]].append(rel["parent_id"])
+        for student_id in misses:
+            parents_by_student_cache.set(student_id, tuple(found[student_id]))
+            result[student_id] = found[student_id]
+    return result
+
+async def get_student_parent_ids(student_id: str) -> List[str]:
+    return (await get_parent_ids_by_student([student_id]))[student_id]
+
+def invalidate_relations(parent_id: str, student_id: str):
+    students_by_parent_cache.delete(parent_id)
+    parents_by_student_cache.delete(student_id)
+
 # Auth helper functions
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -154,42 +637,462 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """Runs bcrypt on a bounded worker pool so it never blocks the event loop."""
+
+    def __init__(self, workers: int, queue_limit: int, executor: str = "thread"):
+        if executor == "process":
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pending = 0
+
+    async def _run(self, operation: str, func, *args):
+        # Shed load instead of queueing unboundedly behind slow hashes
+        if self.pending >= self.workers + self.queue_limit:
+            metrics.inc("password_hash_rejected_total", operation=operation)
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)}
+            )
+        self.pending += 1
+        metrics.set("password_hash_queue_depth", self.pending)
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            metrics.set("password_hash_queue_depth", self.pending)
+            metrics.observe("password_hash_seconds", time.perf_counter() - start, operation=operation)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT, PASSWORD_HASH_EXECUTOR)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def principal_claims(user: User) -> dict:
+    # Enough of the principal to authenticate without loading the user
+    return {"sub": user.email, "id": user.id, "role": user.role, "name": user.name, "ver": user.token_version}
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are random, so a fast digest is enough to keep them out of the database
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def successor_refresh_token(token: str) -> str:
+    # Derived from the rotated token, so concurrent refreshes of one token agree on its successor
+    digest = hmac.new(SECRET_KEY.encode(), token.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+async def issue_tokens(user: User, family_id: Optional[str] = None, refresh_token: Optional[str] = None) -> dict:
+    # Each refresh token is single use; its replacement stays in the same family
+    refresh_token = refresh_token or secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    try:
+        await db.refresh_tokens.update_one(
+            {"token_hash": hash_refresh_token(refresh_token)},
+            {"$setOnInsert": {
+                "family_id": family_id or str(uuid.uuid4()),
+                "user_id": user.id,
+                "used_at": None,
+                "created_at": now,
+                "expires_at": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # a concurrent refresh of the same token stored the successor first
+    return {
+        "access_token": create_access_token(data=principal_claims(user)),
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+class TokenVersionTable:
+    """In-memory copy of the token versions of users who have revoked their tokens.
+
+    Only users whose version was ever bumped are stored, so the table stays
+    small and is cheap to reload every TOKEN_VERSION_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self.versions = {}
+        self._task = None
+
+    def get(self, user_id: str) -> int:
+        return self.versions.get(user_id, 0)
+
+    def set(self, user_id: str, version: int):
+        self.versions[user_id] = max(version, self.get(user_id))
+
+    async def refresh(self):
+        docs = await db.users.find({"token_version": {"$gt": 0}}, {"id": 1, "token_version": 1}).to_list(None)
+        self.versions = {doc["id"]: doc["token_version"] for doc in docs}
+        metrics.set("token_version_entries", len(self.versions))
+
+    def start(self):
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Token version refresh failed: {e}")
+            await asyncio.sleep(TOKEN_VERSION_REFRESH_SECONDS)
+
+token_versions = TokenVersionTable()
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await authenticate_token(credentials.credentials)
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    # Access tokens carry no typ claim; event stream tickets are only accepted by /api/events
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    if payload.get("sub") is None or payload.get("typ", "access") != token_type:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    return payload
+
+async def authenticate_token(token: str) -> User:
+    return await authenticate_claims(decode_token(token))
+
+async def authenticate_claims(payload: dict) -> User:
+    email = payload["sub"]
+    version = payload.get("ver", 0)
+    
+    # Tokens issued before claims mode lack the principal fields and fall through to a lookup
+    if AUTH_MODE == "claims" and "id" in payload:
+        if version < token_versions.get(payload["id"]):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return User(
+            id=payload["id"],
+            email=email,
+            name=payload["name"],
+            role=payload["role"],
+            hashed_password="",
+            token_version=version
+        )
     
-    user = await db.users.find_one({"email": email})
+    user = await principal_cache.get(email)
     if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return User(**user)
+        user = await db.users.find_one({"email": email})
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = User(**user)
+        await principal_cache.set(email, user)
+    if version < user.token_version:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return user
+
+# Email delivery
+class ConsoleEmailTransport:
+    """Prints messages instead of sending them; the default for development."""
+
+    def send_batch(self, messages: List[tuple]) -> List[bool]:
+        for to_email, subject, body in messages:
+            print(f"EMAIL TO: {to_email}")
+            print(f"SUBJECT: {subject}")
+            print(f"BODY: {body}")
+        return [True] * len(messages)
+
+    def close(self):
+        pass
+
+class SMTPEmailTransport:
+    """Sends batches over pooled, reused SMTP connections.
+
+    send_batch blocks and runs on the sender's executor threads, which also
+    build the MIME messages; idle connections are kept in a thread-safe pool
+    between batches.
+    """
+
+    def __init__(self, host: str, port: int, pool_size: int):
+        self.host = host
+        self.port = port
+        self._pool = queue_module.LifoQueue(maxsize=pool_size)
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            connection.starttls()
+        if SMTP_USERNAME:
+            connection.login(SMTP_USERNAME, SMTP_PASSWORD)
+        metrics.inc("smtp_connections_opened_total")
+        return connection
+
+    @staticmethod
+    def _build(to_email: str, subject: str, body: str) -> str:
+        message = MIMEText(body, "plain", "utf-8")
+        message["From"] = EMAIL_FROM
+        message["To"] = to_email
+        message["Subject"] = EmailHeader(subject, "utf-8")
+        return message.as_string()
+
+    def send_batch(self, messages: List[tuple]) -> List[bool]:
+        try:
+            connection = self._pool.get_nowait()
+            reused = True
+        except queue_module.Empty:
+            connection = self._connect()
+            reused = False
+        
+        results = []
+        for to_email, subject, body in messages:
+            message = self._build(to_email, subject, body)
+            try:
+                connection.sendmail(EMAIL_FROM, [to_email], message)
+                results.append(True)
+            except smtplib.SMTPServerDisconnected:
+                if not reused or results:
+                    break
+                # The pooled connection went stale while idle, so reconnect once and carry on
+                connection = self._connect()
+                reused = False
+                try:
+                    connection.sendmail(EMAIL_FROM, [to_email], message)
+                    results.append(True)
+                except smtplib.SMTPException:
+                    break
+            except smtplib.SMTPException:
+                results.append(False)
+                try:
+                    connection.rset()
+                except smtplib.SMTPException:
+                    break
+        
+        if len(results) < len(messages):
+            # The connection is unusable; whatever was not sent is retried by the sender
+            results.extend([False] * (len(messages) - len(results)))
+            self._discard(connection)
+        else:
+            try:
+                self._pool.put_nowait(connection)
+            except queue_module.Full:
+                self._discard(connection)
+        return results
 
-# Send email notification (basic implementation)
-async def send_email_notification(to_email: str, subject: str, body: str):
+    def _discard(self, connection: smtplib.SMTP):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._pool.get_nowait())
+            except queue_module.Empty:
+                return
+
+class EmailSender:
+    """Queues outgoing email and delivers it in batches off the event loop.
+
+    Workers take up to EMAIL_BATCH_SIZE queued messages at a time and hand
+    them to the transport on a thread pool, so at most EMAIL_CONCURRENCY
+    batches (and SMTP connections) are in flight. Failed messages are queued
+    again with exponential backoff until EMAIL_MAX_RETRIES attempts are used.
+    """
+
+    def __init__(self, transport, workers: int, batch_size: int):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email")
+        self._tasks = []
+        self._retries = set()
+
+    def send(self, to_email: str, subject: str, body: str) -> asyncio.Future:
+        # The returned future resolves to whether the message was eventually delivered
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait({"message": (to_email, subject, body), "attempts": 0, "future": future})
+        metrics.set("email_queue_depth", self.queue.qsize())
+        return future
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.transport.close)
+        self._executor.shutdown(wait=False)
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Give concurrent senders a moment to fill the batch
+            deadline = time.monotonic() + EMAIL_BATCH_WAIT
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=max(deadline - time.monotonic(), 0)))
+                except asyncio.TimeoutError:
+                    break
+            metrics.set("email_queue_depth", self.queue.qsize())
+            
+            start = time.perf_counter()
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.transport.send_batch, [item["message"] for item in batch]
+                )
+            except Exception as e:
+                logger.error(f"Email batch failed: {e}")
+                results = [False] * len(batch)
+            metrics.observe("email_batch_seconds", time.perf_counter() - start)
+            
+            for item, delivered in zip(batch, results):
+                item["attempts"] += 1
+                if delivered:
+                    metrics.inc("emails_sent_total")
+                    self._resolve(item, True)
+                elif item["attempts"] < EMAIL_MAX_RETRIES:
+                    metrics.inc("emails_retried_total")
+                    task = asyncio.create_task(self._retry(item, EMAIL_RETRY_BACKOFF * 2 ** (item["attempts"] - 1)))
+                    self._retries.add(task)
+                    task.add_done_callback(self._retries.discard)
+                else:
+                    metrics.inc("emails_failed_total")
+                    self._resolve(item, False)
+
+    def _resolve(self, item: dict, delivered: bool):
+        # The caller may have stopped waiting (e.g. a cancelled dispatcher batch)
+        if not item["future"].done():
+            item["future"].set_result(delivered)
+
+    async def _retry(self, item: dict, delay: float):
+        await asyncio.sleep(delay)
+        self.queue.put_nowait(item)
+
+if EMAIL_TRANSPORT == "smtp":
+    email_transport = SMTPEmailTransport(SMTP_HOST, SMTP_PORT, EMAIL_CONCURRENCY)
+else:
+    email_transport = ConsoleEmailTransport()
+email_sender = EmailSender(email_transport, EMAIL_CONCURRENCY, EMAIL_BATCH_SIZE)
+
+async def send_email_notification(to_email: str, subject: str, body: str) -> bool:
+    return await email_sender.send(to_email, subject, body)
+
+# Cursor pagination helpers
+def to_naive_utc(value: datetime) -> datetime:
+    # Stored datetimes are naive UTC, so aware query parameters are normalised to match
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def to_stored_datetime(value: datetime) -> datetime:
+    # BSON dates keep milliseconds, so a value written like this reads back unchanged
+    value = to_naive_utc(value)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["created_at"].isoformat(), doc["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
     try:
-        # Basic email implementation - in production use proper email service
-        print(f"EMAIL TO: {to_email}")
-        print(f"SUBJECT: {subject}")
-        print(f"BODY: {body}")
-        # You would implement actual email sending here
-        return True
-    except Exception as e:
-        print(f"Email sending failed: {e}")
-        return False
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, doc_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), doc_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def find_page(collection, query: dict, cursor: Optional[str], limit: int, direction: int = ASCENDING, projection: Optional[dict] = None):
+    # Keyset pagination on (created_at, id) so deep pages cost the same as the first
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        op = "$gt" if direction == ASCENDING else "$lt"
+        query = {"$and": [query, {"$or": [
+            {"created_at": {op: created_at}},
+            {"created_at": created_at, "id": {op: doc_id}}
+        ]}]}
+    
+    docs = await collection.find(query, projection or FULL_VIEW).sort([("created_at", direction), ("id", direction)]).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def cursor_headers(next_cursor: Optional[str]) -> Optional[dict]:
+    return {"X-Next-Cursor": next_cursor} if next_cursor else None
+
+# List views: compact by default, ?view=full for whole documents or ?fields= for a custom set
+FULL_VIEW = {"_id": 0}
+COMPACT_FIELDS = {
+    "Task": ["id", "title", "subject_id", "due_date", "completed", "priority", "created_at"],
+    "Project": ["id", "name", "subject_id", "created_at"],
+    "ProjectTask": ["id", "title", "status", "due_date", "created_at"],
+    "Subject": ["id", "name", "color"],
+    "Notification": ["id", "title", "message", "type", "read", "created_at"],
+}
+
+def list_projection(model, view: str = "compact", fields: Optional[str] = None) -> dict:
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - set(model.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        # id and created_at are always returned because pagination cursors are built from them
+        return {"_id": 0, **{field: 1 for field in requested | {"id", "created_at"}}}
+    if view == "full":
+        return FULL_VIEW
+    return {"_id": 0, **{field: 1 for field in COMPACT_FIELDS[model.__name__]}}
+
+ListView = Literal["compact", "full"]
+
+# Response serialization helpers
+def serialize_documents(docs: List[dict], model, projection: dict = FULL_VIEW) -> List[dict]:
+    # Documents are read with _id excluded, so in fast mode they are already the response shape.
+    # Partial views cannot be validated against the full model and are returned as read.
+    if FAST_JSON_RESPONSES or projection != FULL_VIEW:
+        return docs
+    return [model(**doc).dict() for doc in docs]
+
+def json_response(content, headers: Optional[dict] = None, endpoint: str = ""):
+    start = time.perf_counter()
+    if FAST_JSON_RESPONSES:
+        response = ORJSONResponse(content, headers=headers)
+    else:
+        response = JSONResponse(jsonable_encoder(content), headers=headers)
+    metrics.observe("serialization_seconds", time.perf_counter() - start, endpoint=endpoint)
+    return response
+
+# Access scope helpers
+async def get_student_ids(current_user: User) -> List[str]:
+    if current_user.role == "student":
+        return [current_user.id]
+    # Parents see data from all their students
+    return await get_parent_student_ids(current_user.id)
+
+def student_filter(student_ids: List[str]) -> dict:
+    if len(student_ids) == 1:
+        return {"student_id": student_ids[0]}
+    return {"student_id": {"$in": student_ids}}
 
 # Default subjects
 DEFAULT_SUBJECTS = [
@@ -203,6 +1106,74 @@ DEFAULT_SUBJECTS = [
     {"name": "Music", "color": "#84CC16"},
 ]
 
+# Account provisioning helpers
+transactions_supported = None if MONGO_TRANSACTIONS == "auto" else False
+
+async def write_atomically(write, compensate):
+    # Use a transaction when the deployment supports one (replica set or mongos).
+    # A standalone mongod rejects transactions, so fall back to undoing partial writes.
+    global transactions_supported
+    if transactions_supported is not False:
+        try:
+            async with await client.start_session() as session:
+                async with session.start_transaction():
+                    await write(session)
+            transactions_supported = True
+            return
+        except OperationFailure as e:
+            if e.code != 20:  # IllegalOperation: transactions are not supported here
+                raise
+            transactions_supported = False
+            logger.info("MongoDB transactions unavailable, using compensating writes")
+    
+    try:
+        await write(None)
+    except Exception:
+        await compensate()
+        raise
+
+async def create_accounts(users: List[User]):
+    # All users plus every student's default subjects go out in two batched writes
+    user_docs = [user.dict() for user in users]
+    subject_docs = [
+        Subject(name=subject_data["name"], color=subject_data["color"], student_id=user.id).dict()
+        for user in users if user.role == "student"
+        for subject_data in DEFAULT_SUBJECTS
+    ]
+    user_ids = [user.id for user in users]
+    counter_docs = [{"user_id": user_id, "unread": 0} for user_id in user_ids]
+    
+    async def write(session):
+        await db.users.insert_many(user_docs, session=session)
+        await db.notification_counters.insert_many(counter_docs, session=session)
+        if subject_docs:
+            await db.subjects.insert_many(subject_docs, session=session)
+    
+    async def compensate():
+        await db.subjects.delete_many({"student_id": {"$in": user_ids}})
+        await db.notification_counters.delete_many({"user_id": {"$in": user_ids}})
+        await db.users.delete_many({"id": {"$in": user_ids}})
+    
+    await write_atomically(write, compensate)
+    for user in users:
+        await invalidate_principal(user.email)
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    # Submit in pool-sized chunks so a large roster never trips the hashing backpressure
+    hashes = []
+    for i in range(0, len(passwords), password_hasher.workers):
+        chunk = passwords[i:i + password_hasher.workers]
+        hashes.extend(await asyncio.gather(*(password_hasher.hash(p) for p in chunk)))
+    return hashes
+
+def public_user(user: User) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "name": user.name,
+        "role": user.role
+    }
+
 # Authentication endpoints
 @api_router.post("/auth/register")
 async def register(user_data: UserCreate):
@@ -211,8 +1182,8 @@ async def register(user_data: UserCreate):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create user
-    hashed_password = get_password_hash(user_data.password)
+    # Create user and default subjects for students
+    hashed_password = await password_hasher.hash(user_data.password)
     user = User(
         email=user_data.email,
         name=user_data.name,
@@ -220,51 +1191,148 @@ async def register(user_data: UserCreate):
         hashed_password=hashed_password
     )
     
-    await db.users.insert_one(user.dict())
-    
-    # Create default subjects for students
-    if user_data.role == "student":
-        for subject_data in DEFAULT_SUBJECTS:
-            subject = Subject(
-                name=subject_data["name"],
-                color=subject_data["color"],
-                student_id=user.id
-            )
-            await db.subjects.insert_one(subject.dict())
+    try:
+        await create_accounts([user])
+    except (DuplicateKeyError, BulkWriteError):
+        raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create access token
-    access_token = create_access_token(data={"sub": user.email})
+    # Create access and refresh tokens
+    tokens = await issue_tokens(user)
     
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "name": user.name,
-            "role": user.role
-        }
+        **tokens,
+        "user": public_user(user)
     }
 
+async def import_roster(entries: List[UserCreate], skipped: List[dict]):
+    created = []
+    seen = set()
+    for i in range(0, len(entries), ROSTER_BATCH_SIZE):
+        batch = entries[i:i + ROSTER_BATCH_SIZE]
+        emails = [entry.email for entry in batch]
+        existing = await db.users.find({"email": {"$in": emails}}, {"email": 1}).to_list(None)
+        seen |= {doc["email"] for doc in existing}
+        
+        pending = []
+        for entry in batch:
+            if entry.email in seen:
+                skipped.append({"email": entry.email, "reason": "Email already registered"})
+            else:
+                seen.add(entry.email)
+                pending.append(entry)
+        if not pending:
+            continue
+        
+        hashed_passwords = await hash_passwords([entry.password for entry in pending])
+        users = [
+            User(email=entry.email, name=entry.name, role=entry.role, hashed_password=hashed_password)
+            for entry, hashed_password in zip(pending, hashed_passwords)
+        ]
+        try:
+            await create_accounts(users)
+        except (DuplicateKeyError, BulkWriteError):
+            # Another request registered one of these emails after the existence check
+            skipped.extend({"email": user.email, "reason": "Conflicting registration, retry import"} for user in users)
+            continue
+        created.extend(public_user(user) for user in users)
+    
+    return {"created": created, "skipped": skipped}
+
+def require_roster_key(x_admin_key: Optional[str] = Header(None)):
+    if not ROSTER_IMPORT_KEY or x_admin_key != ROSTER_IMPORT_KEY:
+        raise HTTPException(status_code=403, detail="Roster import is not permitted")
+
+@api_router.post("/auth/register/bulk", dependencies=[Depends(require_roster_key)])
+async def register_bulk(roster: RosterImport):
+    return await import_roster(roster.users, [])
+
+@api_router.post("/auth/register/bulk/csv", dependencies=[Depends(require_roster_key)])
+async def register_bulk_csv(file: UploadFile = File(...)):
+    # Expects a header row with email, name, password and role columns
+    content = (await file.read()).decode("utf-8-sig")
+    entries = []
+    skipped = []
+    for row in csv.DictReader(io.StringIO(content)):
+        try:
+            entries.append(UserCreate(**{k.strip(): (v or "").strip() for k, v in row.items() if k}))
+        except ValidationError as e:
+            skipped.append({"email": row.get("email"), "reason": str(e.errors()[0]["msg"])})
+    return await import_roster(entries, skipped)
+
 @api_router.post("/auth/login")
 async def login(login_data: UserLogin):
     user = await db.users.find_one({"email": login_data.email})
-    if not user or not verify_password(login_data.password, user["hashed_password"]):
+    if not user or not await password_hasher.verify(login_data.password, user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    user = User(**user)
     
-    access_token = create_access_token(data={"sub": user["email"]})
+    tokens = await issue_tokens(user)
     
     return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": {
-            "id": user["id"],
-            "email": user["email"],
-            "name": user["name"],
-            "role": user["role"]
-        }
+        **tokens,
+        "user": public_user(user)
     }
 
+@api_router.post("/auth/refresh")
+async def refresh_access_token(refresh_data: RefreshRequest):
+    token_hash = hash_refresh_token(refresh_data.refresh_token)
+    successor = successor_refresh_token(refresh_data.refresh_token)
+    now = datetime.utcnow()
+    token = await db.refresh_tokens.find_one({"token_hash": token_hash})
+    if token is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    
+    if token["used_at"] is not None:
+        # Shortly after rotation the same token is a concurrent refresh (another tab, a retried
+        # request) and gets the same successor. Later, or once the successor has been rotated
+        # too, it means the token leaked, so the whole family is revoked.
+        in_grace = token["used_at"] > now - timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+        if not in_grace or await db.refresh_tokens.count_documents({"token_hash": hash_refresh_token(successor), "used_at": {"$ne": None}}):
+            await db.refresh_tokens.delete_many({"family_id": token["family_id"]})
+            metrics.inc("refresh_token_reuse_total")
+            logger.warning(f"Refresh token reuse detected for user {token['user_id']}, family revoked")
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+    elif token["expires_at"] <= now:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    
+    user = await db.users.find_one({"id": token["user_id"]})
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    user = User(**user)
+    
+    # The successor is stored before the token is marked used, so a concurrent refresh in
+    # the grace period always finds it
+    tokens = await issue_tokens(user, token["family_id"], successor)
+    await db.refresh_tokens.update_one({"token_hash": token_hash, "used_at": None}, {"$set": {"used_at": now}})
+    
+    return {
+        **tokens,
+        "user": public_user(user)
+    }
+
+@api_router.post("/auth/logout")
+async def logout(refresh_data: RefreshRequest):
+    token = await db.refresh_tokens.find_one({"token_hash": hash_refresh_token(refresh_data.refresh_token)})
+    if token is not None:
+        await db.refresh_tokens.delete_many({"family_id": token["family_id"]})
+    return {"message": "Signed out"}
+
+@api_router.post("/auth/logout-all")
+async def logout_all(current_user: User = Depends(get_current_user)):
+    # Bumping the version revokes every token issued so far
+    user = await db.users.find_one_and_update(
+        {"id": current_user.id},
+        {"$inc": {"token_version": 1}},
+        projection={"token_version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    token_versions.set(current_user.id, user["token_version"])
+    await invalidate_principal(current_user.email)
+    await db.refresh_tokens.delete_many({"user_id": current_user.id})
+    return {"message": "All sessions signed out"}
+
 @api_router.get("/auth/me")
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return {
@@ -274,18 +1342,39 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
         "role": current_user.role
     }
 
+# Dashboard endpoint
+@api_router.get("/dashboard")
+async def get_dashboard(view: ListView = "compact", current_user: User = Depends(get_current_user)):
+    # One authenticated round trip for everything the dashboard renders
+    scope = student_filter(await get_student_ids(current_user))
+    projections = {model: list_projection(model, view) for model in (Task, Project, Subject, Notification)}
+    (tasks, tasks_cursor), (projects, projects_cursor), subjects, (notifications, notifications_cursor) = await asyncio.gather(
+        find_page(db.tasks, dict(scope), None, LIST_PAGE_SIZE, projection=projections[Task]),
+        find_page(db.projects, dict(scope), None, LIST_PAGE_SIZE, projection=projections[Project]),
+        db.subjects.find(dict(scope), projections[Subject]).to_list(1000),
+        find_page(db.notifications, {"user_id": current_user.id}, None, LIST_PAGE_SIZE, DESCENDING, projections[Notification])
+    )
+    
+    return json_response({
+        "tasks": serialize_documents(tasks, Task, projections[Task]),
+        "projects": serialize_documents(projects, Project, projections[Project]),
+        "subjects": serialize_documents(subjects, Subject, projections[Subject]),
+        "notifications": serialize_documents(notifications, Notification, projections[Notification]),
+        "cursors": {
+            "tasks": tasks_cursor,
+            "projects": projects_cursor,
+            "notifications": notifications_cursor
+        }
+    }, endpoint="dashboard")
+
 # Subject endpoints
 @api_router.get("/subjects")
-async def get_subjects(current_user: User = Depends(get_current_user)):
-    if current_user.role == "student":
-        subjects = await db.subjects.find({"student_id": current_user.id}).to_list(1000)
-    else:
-        # Parents see subjects from all their students
-        relations = await db.parent_student_relations.find({"parent_id": current_user.id}).to_list(1000)
-        student_ids = [rel["student_id"] for rel in relations]
-        subjects = await db.subjects.find({"student_id": {"$in": student_ids}}).to_list(1000)
+async def get_subjects(view: ListView = "compact", fields: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    student_ids = await get_student_ids(current_user)
+    projection = list_projection(Subject, view, fields)
+    subjects = await db.subjects.find(student_filter(student_ids), projection).to_list(1000)
     
-    return [Subject(**subject) for subject in subjects]
+    return json_response(serialize_documents(subjects, Subject, projection), endpoint="subjects")
 
 @api_router.post("/subjects")
 async def create_subject(subject_data: SubjectCreate, current_user: User = Depends(get_current_user)):
@@ -301,18 +1390,152 @@ async def create_subject(subject_data: SubjectCreate, current_user: User = Depen
     await db.subjects.insert_one(subject.dict())
     return subject
 
+# Student progress counters
+def task_counts(task: Optional[dict]) -> dict:
+    if task is None:
+        return {}
+    completed = 1 if task["completed"] else 0
+    counts = {"total_tasks": 1, "completed_tasks": completed}
+    # Legacy tasks may carry ids that are not valid field names; they only count towards the totals
+    if re.fullmatch(SUBJECT_ID_PATTERN, task["subject_id"]):
+        counts[f"subjects.{task['subject_id']}.total"] = 1
+        counts[f"subjects.{task['subject_id']}.completed"] = completed
+    return counts
+
+def project_task_counts(task: Optional[dict]) -> dict:
+    return {f"project_tasks.{task['status']}": 1} if task is not None else {}
+
+def stats_delta(counts, before: Optional[dict], after: Optional[dict], delta: Optional[dict] = None) -> dict:
+    # Accumulates the $inc that moves a student's counters from before to after
+    delta = delta if delta is not None else defaultdict(int)
+    for key, value in counts(after).items():
+        delta[key] += value
+    for key, value in counts(before).items():
+        delta[key] -= value
+    return delta
+
+async def apply_stats_delta(student_id: str, delta: dict):
+    changes = {key: value for key, value in delta.items() if value}
+    if changes:
+        result = await db.student_stats.update_one(
+            {"student_id": student_id},
+            {"$inc": changes, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            # First write since the counters were introduced: the source collections
+            # already include this write, so a rebuild gives the right totals
+            await rebuild_student_stats([student_id])
+
+async def rebuild_student_stats(student_ids: Optional[List[str]] = None) -> int:
+    """Recompute student_stats from the source collections.
+
+    Used to backfill and to repair drift; the write paths only ever apply
+    increments. Without student_ids every student is rebuilt.
+    """
+    if student_ids is None:
+        students = await db.users.find({"role": "student"}, {"id": 1}).to_list(None)
+        student_ids = [student["id"] for student in students]
+    if not student_ids:
+        return 0
+    match = {"$match": {"student_id": {"$in": student_ids}}}
+    task_groups, project_groups, project_task_groups = await asyncio.gather(
+        db.tasks.aggregate([match, {"$group": {
+            "_id": {"student_id": "$student_id", "subject_id": "$subject_id"},
+            "total": {"$sum": 1},
+            "completed": {"$sum": {"$cond": ["$completed", 1, 0]}}
+        }}]).to_list(None),
+        db.projects.aggregate([match, {"$group": {"_id": "$student_id", "total": {"$sum": 1}}}]).to_list(None),
+        db.project_tasks.aggregate([match, {"$group": {
+            "_id": {"student_id": "$student_id", "status": "$status"},
+            "total": {"$sum": 1}
+        }}]).to_list(None)
+    )
+    
+    now = datetime.utcnow()
+    stats = {
+        student_id: {"student_id": student_id, "total_tasks": 0, "completed_tasks": 0, "subjects": {},
+                     "total_projects": 0, "project_tasks": {}, "updated_at": now}
+        for student_id in student_ids
+    }
+    for group in task_groups:
+        doc = stats[group["_id"]["student_id"]]
+        doc["total_tasks"] += group["total"]
+        doc["completed_tasks"] += group["completed"]
+        if re.fullmatch(SUBJECT_ID_PATTERN, group["_id"]["subject_id"] or ""):
+            doc["subjects"][group["_id"]["subject_id"]] = {"total": group["total"], "completed": group["completed"]}
+    for group in project_groups:
+        stats[group["_id"]]["total_projects"] = group["total"]
+    for group in project_task_groups:
+        stats[group["_id"]["student_id"]]["project_tasks"][group["_id"]["status"]] = group["total"]
+    
+    await db.student_stats.bulk_write(
+        [ReplaceOne({"student_id": student_id}, doc, upsert=True) for student_id, doc in stats.items()],
+        ordered=False
+    )
+    metrics.inc("student_stats_rebuilt_total", len(stats))
+    return len(stats)
+
+async def find_and_update(collection, query: dict, update_data: dict, transition: Optional[dict] = None, transition_data: Optional[dict] = None):
+    """Apply update_data in one round trip and return the document before and after it.
+
+    When a transition filter is given it is tried first, so the state change
+    (and transition_data) is only written by the request that actually makes
+    it. Returns (None, None) when nothing matches the query.
+    """
+    if transition is not None:
+        changes = {**update_data, **(transition_data or {})}
+        before = await collection.find_one_and_update({**query, **transition}, {"$set": changes}, projection={"_id": 0})
+        if before is not None:
+            return before, {**before, **changes}
+    if update_data:
+        before = await collection.find_one_and_update(query, {"$set": update_data}, projection={"_id": 0})
+    else:
+        before = await collection.find_one(query, {"_id": 0})
+    if before is None:
+        return None, None
+    return before, {**before, **update_data}
+
 # Task endpoints
 @api_router.get("/tasks")
-async def get_tasks(current_user: User = Depends(get_current_user)):
-    if current_user.role == "student":
-        tasks = await db.tasks.find({"student_id": current_user.id}).to_list(1000)
-    else:
-        # Parents see tasks from all their students
-        relations = await db.parent_student_relations.find({"parent_id": current_user.id}).to_list(1000)
-        student_ids = [rel["student_id"] for rel in relations]
-        tasks = await db.tasks.find({"student_id": {"$in": student_ids}}).to_list(1000)
+async def get_tasks(
+    completed: Optional[bool] = None,
+    subject_id: Optional[str] = None,
+    priority: Optional[Literal["low", "medium", "high"]] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    status_filter: Optional[Literal["pending", "completed", "overdue"]] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_PAGE_SIZE_MAX),
+    view: ListView = "compact",
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = student_filter(await get_student_ids(current_user))
+    if completed is not None:
+        query["completed"] = completed
+    if subject_id:
+        query["subject_id"] = subject_id
+    if priority:
+        query["priority"] = priority
+    due_date = {}
+    if due_after:
+        due_date["$gte"] = to_naive_utc(due_after)
+    if due_before:
+        due_date["$lt"] = to_naive_utc(due_before)
+    if status_filter == "pending":
+        query["completed"] = False
+    elif status_filter == "completed":
+        query["completed"] = True
+    elif status_filter == "overdue":
+        query["completed"] = False
+        now = datetime.utcnow()
+        due_date["$lt"] = min(due_date.get("$lt", now), now)
+    if due_date:
+        query["due_date"] = due_date
     
-    return [Task(**task) for task in tasks]
+    projection = list_projection(Task, view, fields)
+    tasks, next_cursor = await find_page(db.tasks, query, cursor, limit, projection=projection)
+    return json_response(serialize_documents(tasks, Task, projection), cursor_headers(next_cursor), endpoint="tasks")
 
 @api_router.post("/tasks")
 async def create_task(task_data: TaskCreate, current_user: User = Depends(get_current_user)):
@@ -327,8 +1550,12 @@ async def create_task(task_data: TaskCreate, current_user: User = Depends(get_cu
         due_date=task_data.due_date,
         priority=task_data.priority
     )
+    if task.due_date is not None:
+        task.due_date_changed_at = task.created_at
     
     await db.tasks.insert_one(task.dict())
+    await apply_stats_delta(current_user.id, stats_delta(task_counts, None, task.dict()))
+    publish_student_event(current_user.id, "task.created", task.dict())
     
     # Notify parents
     await notify_parents_about_task(current_user.id, f"New task created: {task.title}")
@@ -340,45 +1567,178 @@ async def update_task(task_id: str, task_data: TaskUpdate, current_user: User =
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Only students can update tasks")
     
-    task = await db.tasks.find_one({"id": task_id, "student_id": current_user.id})
+    update_data = {k: v for k, v in task_data.dict().items() if v is not None}
+    if "due_date" in update_data:
+        update_data["due_date_changed_at"] = datetime.utcnow()
+    
+    if task_data.completed:
+        before, task = await find_and_update(
+            db.tasks, {"id": task_id, "student_id": current_user.id}, update_data,
+            transition={"completed": False}, transition_data={"completed_at": datetime.utcnow()}
+        )
+    else:
+        before, task = await find_and_update(db.tasks, {"id": task_id, "student_id": current_user.id}, update_data)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    await apply_stats_delta(current_user.id, stats_delta(task_counts, before, task))
     
-    update_data = {k: v for k, v in task_data.dict().items() if v is not None}
-    
-    if task_data.completed is not None and task_data.completed and not task["completed"]:
-        update_data["completed_at"] = datetime.utcnow()
+    if task["completed"] and not before["completed"]:
         # Notify parents about completion
         await notify_parents_about_task(current_user.id, f"Task completed: {task['title']}")
     
-    await db.tasks.update_one({"id": task_id}, {"$set": update_data})
+    updated_task = Task(**task)
+    publish_student_event(current_user.id, "task.updated", updated_task.dict())
+    return updated_task
+
+@api_router.post("/tasks/batch")
+async def batch_update_tasks(batch: TaskBatch, current_user: User = Depends(get_current_user)):
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Only students can update tasks")
+    
+    # Planned values are stored exactly as written, so they can be compared with a re-read
+    now = to_stored_datetime(datetime.utcnow())
+    state = {}
     
-    updated_task = await db.tasks.find_one({"id": task_id})
-    return Task(**updated_task)
+    async def write(session):
+        # One ownership check covers every task in the batch. Inside a transaction it reads
+        # the same snapshot the writes are checked against, so a pinned filter cannot miss.
+        owned = await db.tasks.find(
+            {"id": {"$in": list({operation.id for operation in batch.operations})}, "student_id": current_user.id},
+            {"_id": 0, "id": 1, "title": 1, "completed": 1, "subject_id": 1},
+            session=session
+        ).to_list(None)
+        tasks = {task["id"]: task for task in owned}
+        
+        # Operations are folded into one write per task
+        changes = defaultdict(dict)
+        deletes = set()
+        not_found = []
+        for operation in batch.operations:
+            if operation.id not in tasks or operation.id in deletes:
+                not_found.append(operation.id)
+            elif operation.op == "delete":
+                deletes.add(operation.id)
+            elif operation.op in ("complete", "reopen"):
+                changes[operation.id]["completed"] = operation.op == "complete"
+            else:
+                changes[operation.id].update(operation.dict(include={"subject_id", "due_date", "priority"}, exclude_none=True))
+                if operation.due_date is not None:
+                    changes[operation.id]["due_date"] = to_stored_datetime(operation.due_date)
+        
+        updates = {}
+        requests = []
+        for task_id, task in tasks.items():
+            # Pinned to the state read above, so a task changed concurrently is left alone
+            # instead of being notified about or counted twice
+            query = {"id": task_id, "student_id": current_user.id, "completed": task["completed"], "subject_id": task["subject_id"]}
+            if task_id in deletes:
+                requests.append(DeleteOne(query))
+                continue
+            update_data = {k: v for k, v in changes.get(task_id, {}).items() if k != "completed" or v != task["completed"]}
+            if update_data.get("completed"):
+                update_data["completed_at"] = now
+            if "due_date" in update_data:
+                update_data["due_date_changed_at"] = now
+            if update_data:
+                updates[task_id] = update_data
+                requests.append(UpdateOne(query, {"$set": update_data}))
+        result = await db.tasks.bulk_write(requests, ordered=False, session=session) if requests else None
+        state.update(tasks=tasks, updates=updates, deletes=deletes, not_found=not_found, result=result)
+    
+    async def compensate():
+        # Each write is independent and pinned, so a partial batch is left as applied
+        pass
+    
+    await write_atomically(write, compensate)
+    tasks, updates, deletes, result = state["tasks"], state["updates"], state["deletes"], state["result"]
+    
+    conflicts = set()
+    if result is not None and (result.matched_count < len(updates) or result.deleted_count < len(deletes)):
+        # Only possible without a transaction: the counts say how many pinned filters missed
+        # but not which, so tasks not in their planned state are misses and, if that does not
+        # account for every miss, tasks that only look planned are reported too
+        current = {
+            task["id"]: task
+            for task in await db.tasks.find({"id": {"$in": list(tasks)}}, {"_id": 0}).to_list(None)
+        }
+        missed_updates = {
+            task_id for task_id, update_data in updates.items()
+            if task_id not in current or any(current[task_id].get(k) != v for k, v in update_data.items())
+        }
+        missed_deletes = {task_id for task_id in deletes if task_id in current}
+        if len(updates) - len(missed_updates) > result.matched_count:
+            missed_updates = set(updates)
+        if len(deletes) - len(missed_deletes) > result.deleted_count:
+            missed_deletes = set(deletes)
+        conflicts = missed_updates | missed_deletes
+        # The planned delta no longer describes what was written
+        await rebuild_student_stats([current_user.id])
+    else:
+        delta = defaultdict(int)
+        for task_id in deletes:
+            stats_delta(task_counts, tasks[task_id], None, delta)
+        for task_id, update_data in updates.items():
+            stats_delta(task_counts, tasks[task_id], {**tasks[task_id], **update_data}, delta)
+        await apply_stats_delta(current_user.id, delta)
+    
+    completed = [
+        tasks[task_id]["title"] for task_id, update_data in updates.items()
+        if update_data.get("completed") and task_id not in conflicts
+    ]
+    deleted = [task_id for task_id in deletes if task_id not in conflicts]
+    applied = [task_id for task_id in updates if task_id not in conflicts]
+    updated = await db.tasks.find({"id": {"$in": applied}}, {"_id": 0}).to_list(None) if applied else []
+    for task in updated:
+        publish_student_event(current_user.id, "task.updated", task)
+    for task_id in deleted:
+        publish_student_event(current_user.id, "task.deleted", {"id": task_id})
+    
+    # Parents get one digest for the whole batch rather than one notification per task
+    if len(completed) == 1:
+        await notify_parents_about_task(current_user.id, f"Task completed: {completed[0]}")
+    elif completed:
+        await notify_parents_about_task(current_user.id, f"Completed {len(completed)} tasks", completed)
+    
+    return json_response(
+        {
+            "updated": serialize_documents(updated, Task),
+            "deleted": deleted,
+            "conflicts": [task_id for task_id in tasks if task_id in conflicts],
+            "not_found": state["not_found"]
+        },
+        endpoint="tasks_batch"
+    )
 
 @api_router.delete("/tasks/{task_id}")
 async def delete_task(task_id: str, current_user: User = Depends(get_current_user)):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Only students can delete tasks")
     
-    result = await db.tasks.delete_one({"id": task_id, "student_id": current_user.id})
-    if result.deleted_count == 0:
+    task = await db.tasks.find_one_and_delete({"id": task_id, "student_id": current_user.id}, projection={"_id": 0})
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    await apply_stats_delta(current_user.id, stats_delta(task_counts, task, None))
+    publish_student_event(current_user.id, "task.deleted", {"id": task_id})
     
     return {"message": "Task deleted successfully"}
 
 # Project endpoints
 @api_router.get("/projects")
-async def get_projects(current_user: User = Depends(get_current_user)):
-    if current_user.role == "student":
-        projects = await db.projects.find({"student_id": current_user.id}).to_list(1000)
-    else:
-        # Parents see projects from all their students
-        relations = await db.parent_student_relations.find({"parent_id": current_user.id}).to_list(1000)
-        student_ids = [rel["student_id"] for rel in relations]
-        projects = await db.projects.find({"student_id": {"$in": student_ids}}).to_list(1000)
+async def get_projects(
+    subject_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_PAGE_SIZE_MAX),
+    view: ListView = "compact",
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = student_filter(await get_student_ids(current_user))
+    if subject_id:
+        query["subject_id"] = subject_id
     
-    return [Project(**project) for project in projects]
+    projection = list_projection(Project, view, fields)
+    projects, next_cursor = await find_page(db.projects, query, cursor, limit, projection=projection)
+    return json_response(serialize_documents(projects, Project, projection), cursor_headers(next_cursor), endpoint="projects")
 
 @api_router.post("/projects")
 async def create_project(project_data: ProjectCreate, current_user: User = Depends(get_current_user)):
@@ -393,10 +1753,17 @@ async def create_project(project_data: ProjectCreate, current_user: User = Depen
     )
     
     await db.projects.insert_one(project.dict())
+    await apply_stats_delta(current_user.id, {"total_projects": 1})
     return project
 
 @api_router.get("/projects/{project_id}/tasks")
-async def get_project_tasks(project_id: str, current_user: User = Depends(get_current_user)):
+async def get_project_tasks(
+    project_id: str,
+    status_filter: Optional[ProjectTaskStatus] = Query(None, alias="status"),
+    view: ListView = "compact",
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
     project = await db.projects.find_one({"id": project_id})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -405,15 +1772,16 @@ async def get_project_tasks(project_id: str, current_user: User = Depends(get_cu
     if current_user.role == "student" and project["student_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
     elif current_user.role == "parent":
-        relation = await db.parent_student_relations.find_one({
-            "parent_id": current_user.id,
-            "student_id": project["student_id"]
-        })
-        if not relation:
+        if project["student_id"] not in await get_parent_student_ids(current_user.id):
             raise HTTPException(status_code=403, detail="Access denied")
     
-    tasks = await db.project_tasks.find({"project_id": project_id}).to_list(1000)
-    return [ProjectTask(**task) for task in tasks]
+    query = {"project_id": project_id}
+    if status_filter:
+        query["status"] = status_filter
+    
+    projection = list_projection(ProjectTask, view, fields)
+    tasks = await db.project_tasks.find(query, projection).to_list(1000)
+    return json_response(serialize_documents(tasks, ProjectTask, projection), endpoint="project_tasks")
 
 @api_router.post("/projects/{project_id}/tasks")
 async def create_project_task(project_id: str, task_data: ProjectTaskCreate, current_user: User = Depends(get_current_user)):
@@ -434,26 +1802,33 @@ async def create_project_task(project_id: str, task_data: ProjectTaskCreate, cur
     )
     
     await db.project_tasks.insert_one(task.dict())
+    await apply_stats_delta(current_user.id, stats_delta(project_task_counts, None, task.dict()))
+    publish_student_event(current_user.id, "project_task.created", task.dict())
     return task
 
 @api_router.put("/projects/{project_id}/tasks/{task_id}")
-async def update_project_task(project_id: str, task_id: str, task_data: dict, current_user: User = Depends(get_current_user)):
+async def update_project_task(project_id: str, task_id: str, task_data: ProjectTaskUpdate, current_user: User = Depends(get_current_user)):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Only students can update project tasks")
     
-    task = await db.project_tasks.find_one({"id": task_id, "project_id": project_id, "student_id": current_user.id})
+    update_data = {k: v for k, v in task_data.dict().items() if v is not None}
+    query = {"id": task_id, "project_id": project_id, "student_id": current_user.id}
+    
+    if update_data.get("status") == "done":
+        before, task = await find_and_update(db.project_tasks, query, update_data, transition={"status": {"$ne": "done"}})
+    else:
+        before, task = await find_and_update(db.project_tasks, query, update_data)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    update_data = {k: v for k, v in task_data.items() if v is not None}
-    await db.project_tasks.update_one({"id": task_id}, {"$set": update_data})
+    await apply_stats_delta(current_user.id, stats_delta(project_task_counts, before, task))
     
     # Notify parents if task is completed
-    if task_data.get("status") == "done" and task["status"] != "done":
+    if task["status"] == "done" and before["status"] != "done":
         await notify_parents_about_task(current_user.id, f"Project task completed: {task['title']}")
     
-    updated_task = await db.project_tasks.find_one({"id": task_id})
-    return ProjectTask(**updated_task)
+    updated_task = ProjectTask(**task)
+    publish_student_event(current_user.id, "project_task.updated", updated_task.dict())
+    return updated_task
 
 # Parent invitation endpoints
 @api_router.post("/invite-parent")
@@ -481,8 +1856,8 @@ async def invite_parent(invite_data: ParentInviteCreate, current_user: User = De
     
     await db.parent_invites.insert_one(invite.dict())
     
-    # Send email invitation
-    await send_email_notification(
+    # Send email invitation (delivered in the background)
+    email_sender.send(
         invite_data.parent_email,
         f"School Work Tracker - Invitation from {current_user.name}",
         f"You've been invited by {current_user.name} to track their school work. Use invite code: {invite_code}"
@@ -506,6 +1881,7 @@ async def accept_invite(invite_code: str, current_user: User = Depends(get_curre
     )
     
     await db.parent_student_relations.insert_one(relation.dict())
+    invalidate_relations(relation.parent_id, relation.student_id)
     await db.parent_invites.update_one({"id": invite["id"]}, {"$set": {"accepted": True}})
     
     return {"message": "Invite accepted successfully"}
@@ -516,31 +1892,50 @@ async def get_parent_students(current_user: User = Depends(get_current_user)):
     if current_user.role != "parent":
         raise HTTPException(status_code=403, detail="Only parents can access this endpoint")
     
-    relations = await db.parent_student_relations.find({"parent_id": current_user.id}).to_list(1000)
-    student_ids = [rel["student_id"] for rel in relations]
+    student_ids = await get_student_ids(current_user)
+    
+    return await get_student_summaries(student_ids)
+
+async def get_student_summaries(student_ids: List[str]):
+    # Counters are maintained on write; only the time-dependent overdue count is queried
+    students, stats, overdue = await asyncio.gather(
+        db.users.find({"id": {"$in": student_ids}, "role": "student"}, {"_id": 0, "id": 1, "name": 1, "email": 1}).to_list(None),
+        db.student_stats.find({"student_id": {"$in": student_ids}}, {"_id": 0}).to_list(None),
+        db.tasks.aggregate([
+            {"$match": {"student_id": {"$in": student_ids}, "completed": False, "due_date": {"$lt": datetime.utcnow()}}},
+            {"$group": {"_id": "$student_id", "count": {"$sum": 1}}}
+        ]).to_list(None)
+    )
+    stats = {doc["student_id"]: doc for doc in stats}
+    overdue = {group["_id"]: group["count"] for group in overdue}
     
-    students = await db.users.find({"id": {"$in": student_ids}, "role": "student"}).to_list(1000)
+    # Students created before the counters existed are backfilled on first read
+    missing = [student["id"] for student in students if student["id"] not in stats]
+    if missing:
+        await rebuild_student_stats(missing)
+        async for doc in db.student_stats.find({"student_id": {"$in": missing}}, {"_id": 0}):
+            stats[doc["student_id"]] = doc
     
-    # Get summary data for each student
     result = []
     for student in students:
-        tasks = await db.tasks.find({"student_id": student["id"]}).to_list(1000)
-        projects = await db.projects.find({"student_id": student["id"]}).to_list(1000)
-        
-        completed_tasks = len([t for t in tasks if t["completed"]])
-        total_tasks = len(tasks)
+        student_stats = stats[student["id"]]
+        total_tasks = student_stats.get("total_tasks", 0)
+        completed_tasks = student_stats.get("completed_tasks", 0)
         
         result.append({
-            "student": {
-                "id": student["id"],
-                "name": student["name"],
-                "email": student["email"]
-            },
+            "student": student,
             "stats": {
                 "total_tasks": total_tasks,
                 "completed_tasks": completed_tasks,
                 "pending_tasks": total_tasks - completed_tasks,
-                "total_projects": len(projects)
+                "overdue_tasks": overdue.get(student["id"], 0),
+                "total_projects": student_stats.get("total_projects", 0),
+                # Increments leave zeroed keys behind, so empty buckets are dropped
+                "subjects": {
+                    subject_id: {"total": counts.get("total", 0), "completed": counts.get("completed", 0)}
+                    for subject_id, counts in student_stats.get("subjects", {}).items() if counts.get("total")
+                },
+                "project_tasks": {status: count for status, count in student_stats.get("project_tasks", {}).items() if count}
             }
         })
     
@@ -548,60 +1943,987 @@ async def get_parent_students(current_user: User = Depends(get_current_user)):
 
 # Notification endpoints
 @api_router.get("/notifications")
-async def get_notifications(current_user: User = Depends(get_current_user)):
-    notifications = await db.notifications.find({"user_id": current_user.id}).sort("created_at", -1).to_list(100)
-    return [Notification(**notification) for notification in notifications]
+async def get_notifications(
+    read: Optional[bool] = None,
+    notification_type: Optional[str] = Query(None, alias="type"),
+    cursor: Optional[str] = None,
+    limit: int = Query(LIST_PAGE_SIZE, ge=1, le=LIST_PAGE_SIZE_MAX),
+    view: ListView = "compact",
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = {"user_id": current_user.id}
+    if read is not None:
+        query["read"] = read
+    if notification_type:
+        query["type"] = notification_type
+    
+    projection = list_projection(Notification, view, fields)
+    notifications, next_cursor = await find_page(db.notifications, query, cursor, limit, DESCENDING, projection)
+    return json_response(serialize_documents(notifications, Notification, projection), cursor_headers(next_cursor), endpoint="notifications")
+
+@api_router.get("/notification-preferences")
+async def get_notification_preferences(current_user: User = Depends(get_current_user)):
+    # Read from the database since claims-mode principals do not carry preferences
+    user = await db.users.find_one({"id": current_user.id}, {"_id": 0, "notification_frequency": 1})
+    return {"notification_frequency": (user or {}).get("notification_frequency", "immediate")}
+
+@api_router.put("/notification-preferences")
+async def update_notification_preferences(preferences: NotificationPreferences, current_user: User = Depends(get_current_user)):
+    if current_user.role != "parent":
+        raise HTTPException(status_code=403, detail="Only parents can change notification frequency")
+    
+    await db.users.update_one({"id": current_user.id}, {"$set": {"notification_frequency": preferences.notification_frequency}})
+    await invalidate_principal(current_user.email)
+    return preferences
+
+@api_router.get("/notifications/unread-count")
+async def get_unread_count(current_user: User = Depends(get_current_user)):
+    return {"unread": await get_unread_notification_count(current_user.id)}
+
+@api_router.post("/notifications/read")
+async def mark_notifications_read(read_data: NotificationReadRequest, current_user: User = Depends(get_current_user)):
+    if (read_data.ids is None) == (read_data.before is None):
+        raise HTTPException(status_code=400, detail="Provide either ids or before")
+    
+    query = {"user_id": current_user.id, "read": False}
+    if read_data.ids is not None:
+        query["id"] = {"$in": read_data.ids}
+    else:
+        query["created_at"] = {"$lte": to_naive_utc(read_data.before)}
+    result = await db.notifications.update_many(query, {"$set": {"read": True, "read_at": datetime.utcnow()}})
+    await adjust_unread_counts({current_user.id: -result.modified_count})
+    return {"updated": result.modified_count}
 
 @api_router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, current_user: User = Depends(get_current_user)):
-    await db.notifications.update_one(
-        {"id": notification_id, "user_id": current_user.id},
-        {"$set": {"read": True}}
+    result = await db.notifications.update_one(
+        {"id": notification_id, "user_id": current_user.id, "read": False},
+        {"$set": {"read": True, "read_at": datetime.utcnow()}}
     )
+    await adjust_unread_counts({current_user.id: -result.modified_count})
     return {"message": "Notification marked as read"}
 
+# Unread notification counters
+async def get_unread_notification_count(user_id: str) -> int:
+    counter = await db.notification_counters.find_one({"user_id": user_id})
+    if counter is None:
+        # Only until backfill_unread_counts has run against this database
+        return await db.notifications.count_documents({"user_id": user_id, "read": False})
+    return counter["unread"]
+
+async def adjust_unread_counts(deltas: dict):
+    # Every account gets its counter on creation, so increments are never dropped
+    requests = [
+        UpdateOne({"user_id": user_id}, {"$inc": {"unread": delta}}, upsert=True)
+        for user_id, delta in deltas.items() if delta
+    ]
+    if requests:
+        await db.notification_counters.bulk_write(requests, ordered=False)
+
+async def backfill_unread_counts() -> int:
+    """Create the unread counters of accounts that predate them.
+
+    Runs at startup, before this process stores any notification; once every
+    account has a counter it returns after two estimated counts.
+    """
+    if await db.notification_counters.estimated_document_count() >= await db.users.estimated_document_count():
+        return 0
+    counted = set(await db.notification_counters.distinct("user_id"))
+    users = await db.users.find({}, {"_id": 0, "id": 1}).to_list(None)
+    user_ids = [user["id"] for user in users if user["id"] not in counted]
+    if not user_ids:
+        return 0
+    unread = await db.notifications.aggregate([
+        {"$match": {"user_id": {"$in": user_ids}, "read": False}},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    unread = {group["_id"]: group["count"] for group in unread}
+    await db.notification_counters.bulk_write([
+        UpdateOne({"user_id": user_id}, {"$setOnInsert": {"unread": unread.get(user_id, 0)}}, upsert=True)
+        for user_id in user_ids
+    ], ordered=False)
+    return len(user_ids)
+
 # Helper function to notify parents
-async def notify_parents_about_task(student_id: str, message: str):
-    relations = await db.parent_student_relations.find({"student_id": student_id}).to_list(1000)
-    student = await db.users.find_one({"id": student_id})
-    
-    for relation in relations:
-        parent = await db.users.find_one({"id": relation["parent_id"]})
-        if parent:
-            # Create in-app notification
-            notification = Notification(
-                user_id=parent["id"],
-                title="Student Update",
-                message=f"{student['name']}: {message}",
-                type="task_update"
-            )
-            await db.notifications.insert_one(notification.dict())
+async def notify_parents_about_task(student_id: str, message: str, details: Optional[List[str]] = None):
+    # Recorded in the outbox and fanned out by the notification dispatcher
+    await notification_dispatcher.enqueue(student_id, message, details)
+
+async def insert_new_documents(collection, documents: List[dict]) -> List[dict]:
+    """Insert documents with deterministic ids, skipping those already stored.
+
+    Retried work (re-delivered outbox entries, interrupted job runs) writes
+    the same ids again, so duplicate key errors are expected and ignored.
+    Returns the documents that were actually inserted.
+    """
+    if not documents:
+        return []
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+            raise
+        duplicates = {error["index"] for error in e.details["writeErrors"]}
+        return [document for i, document in enumerate(documents) if i not in duplicates]
+    return documents
+
+async def store_notifications(notifications: List[dict]):
+    notifications = await insert_new_documents(db.notifications, notifications)
+    if not notifications:
+        return
+    metrics.inc("notifications_created_total", len(notifications))
+    unread = defaultdict(int)
+    for notification in notifications:
+        unread[notification["user_id"]] += 1
+    await adjust_unread_counts(unread)
+    for notification in notifications:
+        await event_hub.publish([notification["user_id"]], "notification.created", notification)
+
+class NotificationDispatcher:
+    """Fans student updates out to linked parents in the background.
+
+    Every update is first written to the notification_outbox collection, which
+    is the source of truth: entries survive restarts and are claimed with a
+    lease, so several workers or processes can share the outbox safely. The
+    in-process queue only wakes the workers up early.
+    """
+
+    def __init__(self, workers: int, batch_size: int):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue()
+        self._tasks = []
+
+    async def enqueue(self, student_id: str, message: str, details: Optional[List[str]] = None):
+        entry = {
+            "id": str(uuid.uuid4()),
+            "student_id": student_id,
+            "message": message,
+            "details": details or [],
+            "status": "pending",
+            "attempts": 0,
+            "created_at": datetime.utcnow()
+        }
+        await db.notification_outbox.insert_one(entry)
+        self.queue.put_nowait(entry["id"])
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.queue.get(), timeout=NOTIFICATION_SWEEP_INTERVAL)
+            except asyncio.TimeoutError:
+                pass  # periodic sweep picks up entries left over from a restart
+            while not self.queue.empty():
+                self.queue.get_nowait()
             
-            # Send email notification
-            await send_email_notification(
-                parent["email"],
-                f"School Work Update - {student['name']}",
-                message
+            try:
+                while await self.process_batch():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification dispatch failed")
+
+    async def claim_batch(self):
+        now = datetime.utcnow()
+        # Entries whose lease ran out on their last attempt are dead-lettered instead of
+        # being reclaimed forever at the head of the queue
+        failed = await db.notification_outbox.update_many(
+            {"status": "processing", "lease_until": {"$lt": now}, "attempts": {"$gte": NOTIFICATION_MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "failed_at": now}, "$unset": {"lease_until": "", "claim": ""}}
+        )
+        if failed.modified_count:
+            metrics.inc("notification_outbox_failed_total", failed.modified_count)
+            logger.error(f"Gave up on {failed.modified_count} notification outbox entries after {NOTIFICATION_MAX_ATTEMPTS} attempts")
+        claimable = {"$or": [
+            {"status": "pending"},
+            {"status": "processing", "lease_until": {"$lt": now}, "attempts": {"$lt": NOTIFICATION_MAX_ATTEMPTS}}
+        ]}
+        candidates = await db.notification_outbox.find(claimable, {"_id": 0, "id": 1}).sort("created_at", ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return None, []
+        
+        claim = str(uuid.uuid4())
+        await db.notification_outbox.update_many(
+            {"$and": [{"id": {"$in": [doc["id"] for doc in candidates]}}, claimable]},
+            {"$set": {"status": "processing", "claim": claim, "lease_until": now + timedelta(seconds=NOTIFICATION_LEASE_SECONDS)},
+             "$inc": {"attempts": 1}}
+        )
+        return claim, await db.notification_outbox.find({"claim": claim}).to_list(None)
+
+    async def process_batch(self) -> bool:
+        claim, entries = await self.claim_batch()
+        if not entries:
+            return False
+        
+        try:
+            await self.deliver(claim, entries)
+        except Exception:
+            # Retry one at a time so a single bad entry does not hold back the rest; entries
+            # that still fail stay leased and are retried until NOTIFICATION_MAX_ATTEMPTS
+            logger.exception("Notification batch failed, delivering entries individually")
+            for entry in entries:
+                try:
+                    await self.deliver(claim, [entry])
+                except Exception:
+                    logger.exception(f"Notification outbox entry {entry['id']} failed on attempt {entry['attempts']}")
+        return len(entries) == self.batch_size
+    
+    async def deliver(self, claim: str, entries: List[dict]):
+        start = time.perf_counter()
+        student_ids = list({entry["student_id"] for entry in entries})
+        parents_by_student = {
+            student_id: set(parent_ids)
+            for student_id, parent_ids in (await get_parent_ids_by_student(student_ids)).items()
+        }
+        parent_ids = {parent_id for ids in parents_by_student.values() for parent_id in ids}
+        users = await db.users.find(
+            {"id": {"$in": student_ids + list(parent_ids)}},
+            {"_id": 0, "id": 1, "name": 1, "email": 1, "notification_frequency": 1}
+        ).to_list(None)
+        users = {user["id"]: user for user in users}
+        
+        notifications = []
+        emails = []
+        digest_items = []
+        for entry in entries:
+            student = users.get(entry["student_id"])
+            if not student:
+                continue
+            # Digest entries list the individual updates under the summary line
+            message = "\n".join([entry["message"], *(f"- {detail}" for detail in entry.get("details", []))])
+            for parent_id in parents_by_student[entry["student_id"]]:
+                parent = users.get(parent_id)
+                if not parent:
+                    continue
+                frequency = parent.get("notification_frequency", "immediate")
+                if frequency != "immediate":
+                    # Held back for the parent's hourly or daily summary
+                    digest_items.append({
+                        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{entry['id']}:{parent_id}")),
+                        "parent_id": parent_id,
+                        "frequency": frequency,
+                        "line": f"{student['name']}: {message}",
+                        "created_at": entry["created_at"]
+                    })
+                    continue
+                notification = Notification(
+                    # Deterministic id keeps a re-delivered entry from duplicating notifications
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{entry['id']}:{parent_id}")),
+                    user_id=parent_id,
+                    title="Student Update",
+                    message=f"{student['name']}: {message}",
+                    type="task_update",
+                    created_at=entry["created_at"]
+                )
+                notifications.append(notification.dict())
+                emails.append((parent["email"], f"School Work Update - {student['name']}", message))
+        
+        await store_notifications(notifications)
+        await buffer_digest_items(digest_items)
+        # The email sender batches these over pooled connections and retries failures
+        await asyncio.gather(*(send_email_notification(*email) for email in emails))
+        
+        now = datetime.utcnow()
+        await db.notification_outbox.update_many(
+            {"claim": claim, "id": {"$in": [entry["id"] for entry in entries]}},
+            {"$set": {"status": "done", "processed_at": now}, "$unset": {"lease_until": ""}}
+        )
+        metrics.inc("notification_outbox_processed_total", len(entries))
+        metrics.observe("notification_fanout_seconds", time.perf_counter() - start)
+        for entry in entries:
+            metrics.observe("notification_delivery_delay_seconds", (now - entry["created_at"]).total_seconds())
+
+notification_dispatcher = NotificationDispatcher(NOTIFICATION_WORKERS, NOTIFICATION_BATCH_SIZE)
+
+# Periodic jobs
+class LeasedJob(ABC):
+    """Runs run_once every interval seconds on a single worker.
+
+    Every worker runs the loop, but only the holder of a lease in the
+    scheduler_state collection does any work, so the job is safe to start in
+    every process. An interval of 0 disables the job.
+    """
+
+    name = ""
+
+    def __init__(self, interval: float, lease_seconds: int):
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.owner = str(uuid.uuid4())
+        self._task = None
+
+    def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            # Hand the lease over straight away instead of letting it expire
+            await db.scheduler_state.update_one({"_id": self.name, "owner": self.owner}, {"$set": {"lease_until": datetime.utcnow()}})
+
+    async def _loop(self):
+        while True:
+            try:
+                if await self.acquire_lease():
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"{self.name} run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def acquire_lease(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await db.scheduler_state.find_one_and_update(
+                {"_id": self.name, "$or": [{"lease_until": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            metrics.set("job_leader", 0, job=self.name)
+            return False
+        metrics.set("job_leader", 1, job=self.name)
+        return True
+
+    @abstractmethod
+    async def run_once(self):
+        """Does one pass of the job's work while holding the lease."""
+
+# Due-date reminders
+class DueReminderScheduler(LeasedJob):
+    """Periodically notifies students and their parents about due and overdue tasks.
+
+    Each reminder kind keeps a
+    watermark on due_date, so a run only scans the (completed, due_date) range
+    that has come into its window since the previous one, one time bucket at a
+    time. Tasks whose due date was set since the last run (due_date_changed_at)
+    and falls inside an already scanned range are picked up separately.
+    Notification ids are derived from the task and its due date, so a bucket
+    that is replayed after a crash does not notify twice.
+    """
+
+    name = "due_reminders"
+
+    async def run_once(self):
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        state = await db.scheduler_state.find_one({"_id": self.name}) or {}
+        watermarks = state.get("watermarks", {})
+        if "last_run" in state:
+            changed = {"$gt": state["last_run"]}
+            if watermarks.get("task_due", now) > now:
+                await self.scan("task_due", {
+                    "completed": False,
+                    "due_date": {"$gt": now, "$lte": watermarks["task_due"]},
+                    "due_date_changed_at": changed
+                })
+            if "task_overdue" in watermarks:
+                await self.scan("task_overdue", {
+                    "completed": False,
+                    "due_date": {"$lte": watermarks["task_overdue"]},
+                    "due_date_changed_at": changed
+                })
+        # A fresh deployment starts from now rather than notifying about every past due date
+        missing = {kind: now for kind in ("task_due", "task_overdue") if kind not in watermarks}
+        if missing:
+            await db.scheduler_state.update_one(
+                {"_id": self.name, "owner": self.owner},
+                {"$set": {f"watermarks.{kind}": value for kind, value in missing.items()}}
             )
+            watermarks = {**watermarks, **missing}
+        await self.process_window("task_due", watermarks["task_due"], now + timedelta(hours=REMINDER_DUE_SOON_HOURS))
+        await self.process_window("task_overdue", watermarks["task_overdue"], now)
+        await db.scheduler_state.update_one({"_id": self.name, "owner": self.owner}, {"$set": {"last_run": now}})
+        metrics.observe("reminder_run_seconds", time.perf_counter() - start)
+
+    async def process_window(self, kind: str, since: datetime, until: datetime):
+        bucket = timedelta(minutes=REMINDER_BUCKET_MINUTES)
+        while since < until:
+            bucket_end = min(since + bucket, until)
+            await self.scan(kind, {"completed": False, "due_date": {"$gt": since, "$lte": bucket_end}})
+            # Only the lease holder may move the watermark forward
+            result = await db.scheduler_state.update_one(
+                {"_id": self.name, "owner": self.owner},
+                {"$set": {f"watermarks.{kind}": bucket_end}}
+            )
+            if result.matched_count == 0:
+                return
+            since = bucket_end
+
+    async def scan(self, kind: str, query: dict):
+        # Walks the matching tasks in (due_date, id) order, REMINDER_BATCH_SIZE at a time
+        after = None
+        while True:
+            page_query = dict(query)
+            if after is not None:
+                page_query["$or"] = [
+                    {"due_date": {"$gt": after[0]}},
+                    {"due_date": after[0], "id": {"$gt": after[1]}}
+                ]
+            tasks = await db.tasks.find(
+                page_query, {"_id": 0, "id": 1, "title": 1, "student_id": 1, "due_date": 1}
+            ).sort([("due_date", ASCENDING), ("id", ASCENDING)]).limit(REMINDER_BATCH_SIZE).to_list(None)
+            if tasks:
+                await self.notify(kind, tasks)
+            if len(tasks) < REMINDER_BATCH_SIZE:
+                return
+            after = (tasks[-1]["due_date"], tasks[-1]["id"])
+
+    async def notify(self, kind: str, tasks: List[dict]):
+        student_ids = list({task["student_id"] for task in tasks})
+        parents_by_student = await get_parent_ids_by_student(student_ids)
+        students = await db.users.find({"id": {"$in": student_ids}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+        names = {student["id"]: student["name"] for student in students}
+        
+        title = "Task due soon" if kind == "task_due" else "Task overdue"
+        now = datetime.utcnow()
+        notifications = []
+        for task in tasks:
+            when = f"{'is due' if kind == 'task_due' else 'was due'} {task['due_date']:%b %d, %H:%M} UTC"
+            recipients = [(task["student_id"], f"{task['title']} {when}")]
+            recipients += [
+                (parent_id, f"{names.get(task['student_id'], 'Your student')}: {task['title']} {when}")
+                for parent_id in parents_by_student[task["student_id"]]
+            ]
+            for user_id, message in recipients:
+                notifications.append(Notification(
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{kind}:{task['id']}:{task['due_date'].isoformat()}:{user_id}")),
+                    user_id=user_id,
+                    title=title,
+                    message=message,
+                    type=kind,
+                    created_at=now
+                ).dict())
+        await store_notifications(notifications)
+        metrics.inc("reminders_sent_total", len(notifications), kind=kind)
+
+due_reminder_scheduler = DueReminderScheduler(REMINDER_INTERVAL_SECONDS, REMINDER_LEASE_SECONDS)
+
+# Notification retention
+async def backfill_read_at() -> int:
+    """Give read notifications that predate read_at one, so they expire like the rest.
+
+    Their read time is unknown, so they get a full retention period from now.
+    """
+    result = await db.notifications.update_many(
+        {"read": True, "read_at": None}, {"$set": {"read_at": datetime.utcnow()}}
+    )
+    return result.modified_count
+
+class NotificationRetention(LeasedJob):
+    """Keeps the notifications collection bounded.
+
+    Read notifications normally expire through the TTL index on read_at. With
+    NOTIFICATION_ARCHIVE enabled they are instead moved to
+    notifications_archive by this job, as are the oldest unread notifications
+    of users over NOTIFICATION_UNREAD_CAP. TTL deletions are not observable
+    per document, so collection sizes are exported after every run as well.
+    """
+
+    name = "notification_retention"
+
+    async def run_once(self):
+        if NOTIFICATION_ARCHIVE and NOTIFICATION_READ_RETENTION_SECONDS > 0:
+            cutoff = datetime.utcnow() - timedelta(seconds=NOTIFICATION_READ_RETENTION_SECONDS)
+            while True:
+                expired = await db.notifications.find(
+                    {"read": True, "read_at": {"$lt": cutoff}}, {"_id": 0}
+                ).limit(NOTIFICATION_RETENTION_BATCH_SIZE).to_list(None)
+                if expired:
+                    await self.remove(expired, "read_expired")
+                if len(expired) < NOTIFICATION_RETENTION_BATCH_SIZE:
+                    break
+        
+        if NOTIFICATION_UNREAD_CAP > 0:
+            # The counters find the few users over the cap; their exact count guards against drift
+            over_cap = await db.notification_counters.find(
+                {"unread": {"$gt": NOTIFICATION_UNREAD_CAP}}, {"_id": 0, "user_id": 1}
+            ).to_list(None)
+            for counter in over_cap:
+                user_id = counter["user_id"]
+                excess = await db.notifications.count_documents({"user_id": user_id, "read": False}) - NOTIFICATION_UNREAD_CAP
+                if excess <= 0:
+                    continue
+                oldest = await db.notifications.find(
+                    {"user_id": user_id, "read": False}, {"_id": 0}
+                ).sort([("created_at", ASCENDING), ("id", ASCENDING)]).limit(excess).to_list(None)
+                # Notifications read since they were selected are left to the read expiry
+                removed = await self.remove(oldest, "unread_cap", {"read": False})
+                await adjust_unread_counts({user_id: -removed})
+        
+        for collection_name in ("notifications", "notifications_archive"):
+            metrics.set("collection_documents", await db[collection_name].estimated_document_count(), collection=collection_name)
+
+    async def remove(self, notifications: List[dict], reason: str, query: Optional[dict] = None) -> int:
+        if NOTIFICATION_ARCHIVE:
+            now = datetime.utcnow()
+            # A run interrupted after archiving but before deleting leaves copies behind
+            await insert_new_documents(
+                db.notifications_archive,
+                [{**notification, "archived_at": now, "archive_reason": reason} for notification in notifications]
+            )
+            metrics.inc("notifications_archived_total", len(notifications), reason=reason)
+        result = await db.notifications.delete_many(
+            {"id": {"$in": [notification["id"] for notification in notifications]}, **(query or {})}
+        )
+        metrics.inc("notifications_dropped_total", result.deleted_count, reason=reason)
+        return result.deleted_count
+
+notification_retention = NotificationRetention(NOTIFICATION_RETENTION_INTERVAL_SECONDS, NOTIFICATION_RETENTION_INTERVAL_SECONDS * 3)
+
+# Parent digests
+async def buffer_digest_items(items: List[dict]):
+    # Items are rolled up by when they were buffered, not when the update happened,
+    # so an item delivered late lands in the next summary instead of reopening a sent one
+    now = datetime.utcnow()
+    buffered = await insert_new_documents(db.notification_digests, [{**item, "buffered_at": now} for item in items])
+    if buffered:
+        metrics.inc("digest_items_buffered_total", len(buffered))
+
+def digest_period_start(frequency: str, now: datetime) -> datetime:
+    if frequency == "hourly":
+        return now.replace(minute=0, second=0, microsecond=0)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class DigestRollup(LeasedJob):
+    """Rolls buffered parent updates up into one notification and email per period.
+
+    Only periods that have already ended are rolled up (hours and days are
+    UTC), and items belong to the period they were buffered in, so each parent
+    gets at most one summary per period however often the job runs. Buffered
+    items are deleted once their summary is stored.
+    """
+
+    name = "digest_rollup"
+
+    async def run_once(self):
+        now = datetime.utcnow()
+        for frequency in ("hourly", "daily"):
+            await self.roll_up(frequency, digest_period_start(frequency, now))
+
+    async def roll_up(self, frequency: str, before: datetime):
+        groups = await db.notification_digests.aggregate([
+            {"$match": {"frequency": frequency, "buffered_at": {"$lt": before}}},
+            {"$sort": {"created_at": ASCENDING}},
+            {"$group": {"_id": "$parent_id", "ids": {"$push": "$id"}, "lines": {"$push": "$line"}}}
+        ]).to_list(None)
+        if not groups:
+            return
+        
+        parents = await db.users.find(
+            {"id": {"$in": [group["_id"] for group in groups]}},
+            {"_id": 0, "id": 1, "email": 1}
+        ).to_list(None)
+        emails_by_parent = {parent["id"]: parent["email"] for parent in parents}
+        
+        title = "Hourly summary" if frequency == "hourly" else "Daily summary"
+        notifications = []
+        emails = []
+        for group in groups:
+            lines = group["lines"][:DIGEST_MAX_LINES]
+            if len(group["lines"]) > DIGEST_MAX_LINES:
+                lines.append(f"...and {len(group['lines']) - DIGEST_MAX_LINES} more updates")
+            message = "\n".join(lines)
+            notifications.append(Notification(
+                # Same period and items give the same id, so a retried run does not duplicate it
+                id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"digest:{group['_id']}:{before.isoformat()}:{group['ids'][0]}")),
+                user_id=group["_id"],
+                title=title,
+                message=message,
+                type="digest"
+            ).dict())
+            if group["_id"] in emails_by_parent:
+                emails.append((emails_by_parent[group["_id"]], f"School Work {title}", message))
+        
+        await store_notifications(notifications)
+        await asyncio.gather(*(send_email_notification(*email) for email in emails))
+        await db.notification_digests.delete_many({"id": {"$in": [item_id for group in groups for item_id in group["ids"]]}})
+        metrics.inc("digests_sent_total", len(notifications), frequency=frequency)
+
+digest_rollup = DigestRollup(DIGEST_INTERVAL_SECONDS, int(DIGEST_INTERVAL_SECONDS * 3))
+
+# Real-time push channel
+class EventHub:
+    """In-process pub/sub that feeds the per-connection queues of /api/events.
+
+    Publishing goes through a backend: the local backend delivers straight to
+    this process's subscribers, the Mongo backend relays through a change
+    stream so events published by one worker reach clients on every worker.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers = defaultdict(set)
+        self.connections = 0
+        self.backend = None
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[user_id].add(queue)
+        self.connections += 1
+        metrics.set("push_connections", self.connections)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(user_id)
+        if queues and queue in queues:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+            self.connections -= 1
+            metrics.set("push_connections", self.connections)
+
+    def has_subscribers(self) -> bool:
+        # Other workers may hold the subscribers when events are relayed through Mongo
+        return self.backend.shared or bool(self.subscribers)
+
+    async def publish(self, user_ids: List[str], event_type: str, data):
+        if not self.has_subscribers():
+            return
+        event = {"type": event_type, "data": jsonable_encoder(data), "published_at": time.time()}
+        await self.backend.publish(list(set(user_ids)), event)
+
+    def deliver(self, user_ids: List[str], event: dict):
+        for user_id in user_ids:
+            for queue in self.subscribers.get(user_id, ()):
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # A slow client gets told to refetch instead of receiving a gapped stream
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait({"type": "resync", "data": {}, "published_at": event["published_at"]})
+                    metrics.inc("push_events_dropped_total")
+                metrics.inc("push_events_delivered_total")
+
+class LocalEventBackend:
+    shared = False
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+
+    async def publish(self, user_ids: List[str], event: dict):
+        self.hub.deliver(user_ids, event)
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+class MongoEventBackend:
+    shared = True
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+        self._task = None
+
+    async def publish(self, user_ids: List[str], event: dict):
+        await db.push_events.insert_one({"user_ids": user_ids, "event": event, "created_at": datetime.utcnow()})
+
+    def start(self):
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _watch(self):
+        while True:
+            try:
+                async with db.push_events.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                    async for change in stream:
+                        document = change["fullDocument"]
+                        self.hub.deliver(document["user_ids"], document["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Push event change stream failed, reconnecting")
+                await asyncio.sleep(1)
+
+event_hub = EventHub(PUSH_QUEUE_SIZE)
+event_hub.backend = MongoEventBackend(event_hub) if PUSH_BACKEND == "mongo" else LocalEventBackend(event_hub)
+background_tasks = set()
+
+async def _publish_student_event(student_id: str, event_type: str, data):
+    await event_hub.publish([student_id] + await get_student_parent_ids(student_id), event_type, data)
+
+def publish_student_event(student_id: str, event_type: str, data):
+    # Pushes to the student and linked parents without holding up the response
+    if not event_hub.has_subscribers():
+        return
+    task = asyncio.create_task(_publish_student_event(student_id, event_type, data))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+@api_router.post("/events/ticket")
+async def create_event_ticket(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    # EventSource cannot send headers, so the stream is opened with a short-lived ticket
+    # in the query string rather than the access token itself
+    payload = decode_token(credentials.credentials)
+    await authenticate_claims(payload)
+    ticket = {**payload, "typ": "events", "stream_until": payload["exp"]}
+    ticket["exp"] = datetime.utcnow() + timedelta(seconds=PUSH_TICKET_SECONDS)
+    return {"ticket": jwt.encode(ticket, SECRET_KEY, algorithm=ALGORITHM)}
+
+@api_router.get("/events")
+async def stream_events(ticket: str):
+    payload = decode_token(ticket, "events")
+    user = await authenticate_claims(payload)
+    queue = event_hub.subscribe(user.id)
+    
+    async def event_stream():
+        # The stream ends when the access token behind the ticket expires, and a
+        # revoked token is noticed at the next keepalive; the client then reconnects
+        # with a ticket for its current token
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                remaining = payload["stream_until"] - time.time()
+                if remaining <= 0:
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=min(PUSH_KEEPALIVE_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    if remaining < PUSH_KEEPALIVE_SECONDS:
+                        return
+                    try:
+                        await authenticate_claims(payload)
+                    except HTTPException:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                metrics.observe("push_fanout_seconds", time.time() - event["published_at"])
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            event_hub.unsubscribe(user.id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Include the router in the main app
 app.include_router(api_router)
 
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    # Scrapers authenticate with "Authorization: Bearer <METRICS_TOKEN>"
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if authorization is None or not secrets.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=403, detail="Metrics access is not permitted")
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    return metrics.render()
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    commands = []
+    token = request_mongo_commands.set(commands)
+    metrics.add("http_requests_in_flight", 1)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.add("http_requests_in_flight", -1)
+        request_mongo_commands.reset(token)
+        # Label by route template so ids in the path do not explode the series count
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        metrics.observe("http_request_seconds", elapsed, method=request.method, route=path)
+        metrics.inc("http_requests_total", method=request.method, route=path, status=status_code)
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            logger.warning(
+                f"Slow request {request.method} {request.url.path} took {elapsed * 1000:.1f}ms "
+                f"with {len(commands)} Mongo commands: {'; '.join(commands)}"
+            )
+
+# Index provisioning
+async def ensure_indexes():
+    # create_indexes is a no-op for indexes that already exist, so this is safe on every startup
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.error(f"Failed to create indexes on {collection_name}: {e}")
+
+async def find_missing_indexes():
+    missing = []
+    for collection_name, indexes in INDEXES.items():
+        existing = await db[collection_name].index_information()
+        existing_keys = [info["key"] for info in existing.values()]
+        for index in indexes:
+            keys = list(index.document["key"].items())
+            if keys not in existing_keys:
+                missing.append((collection_name, keys))
+    return missing
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            stages.extend(_plan_stages(plan[child_key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+async def check_indexes(slow_ms: int = 100):
+    ok = True
+    for collection_name, keys in await find_missing_indexes():
+        ok = False
+        print(f"MISSING INDEX: {collection_name} {keys}")
+    
+    for collection_name, query, sort in HOT_QUERIES:
+        find_command = {"find": collection_name, "filter": query}
+        if sort:
+            find_command["sort"] = sort
+        explain = await db.command("explain", find_command, verbosity="executionStats")
+        stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+        millis = explain.get("executionStats", {}).get("executionTimeMillis", 0)
+        problems = []
+        if "COLLSCAN" in stages:
+            problems.append("collection scan")
+        if "SORT" in stages:
+            problems.append("in-memory sort")
+        if millis >= slow_ms:
+            problems.append(f"{millis} ms")
+        status_text = "SLOW" if problems else "OK"
+        print(f"{status_text:<5}{collection_name} {query} sort={sort} plan={' <- '.join(stages)}"
+              + (f" ({', '.join(problems)})" if problems else ""))
+        ok = ok and not problems
+    return ok
+
+@app.on_event("startup")
+async def startup_check_project_task_limits():
+    # Project tasks are never size-checked, so the field limits alone must keep them within the budget
+    largest = largest_project_task_size()
+    if largest > PROJECT_TASK_MAX_BYTES:
+        raise RuntimeError(
+            f"PROJECT_TASK_TITLE_MAX={PROJECT_TASK_TITLE_MAX} and PROJECT_TASK_DESCRIPTION_MAX={PROJECT_TASK_DESCRIPTION_MAX} "
+            f"allow project tasks of {largest} bytes, over PROJECT_TASK_MAX_BYTES={PROJECT_TASK_MAX_BYTES}; "
+            "lower the field limits or raise the budget"
+        )
+
+@app.on_event("startup")
+async def startup_ensure_indexes():
+    await ensure_indexes()
+
+@app.on_event("startup")
+async def startup_unread_counters():
+    backfilled = await backfill_unread_counts()
+    if backfilled:
+        logger.info(f"Backfilled unread notification counters for {backfilled} users")
+
+@app.on_event("startup")
+async def startup_read_at():
+    backfilled = await backfill_read_at()
+    if backfilled:
+        logger.info(f"Backfilled read_at for {backfilled} read notifications")
+
+@app.on_event("startup")
+async def startup_email_sender():
+    email_sender.start()
+
+@app.on_event("startup")
+async def startup_notification_dispatcher():
+    notification_dispatcher.start()
+
+@app.on_event("startup")
+async def startup_event_hub():
+    event_hub.backend.start()
+
+@app.on_event("startup")
+async def startup_token_versions():
+    if AUTH_MODE == "claims":
+        token_versions.start()
+
+@app.on_event("shutdown")
+async def shutdown_token_versions():
+    await token_versions.stop()
+
+@app.on_event("startup")
+async def startup_due_reminder_scheduler():
+    due_reminder_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_due_reminder_scheduler():
+    await due_reminder_scheduler.stop()
+
+@app.on_event("startup")
+async def startup_digest_rollup():
+    digest_rollup.start()
+
+@app.on_event("shutdown")
+async def shutdown_digest_rollup():
+    await digest_rollup.stop()
+
+@app.on_event("startup")
+async def startup_notification_retention():
+    notification_retention.start()
+
+@app.on_event("shutdown")
+async def shutdown_notification_retention():
+    await notification_retention.stop()
+
+@app.on_event("shutdown")
+async def shutdown_notification_dispatcher():
+    await notification_dispatcher.stop()
+
+@app.on_event("shutdown")
+async def shutdown_event_hub():
+    await event_hub.backend.stop()
+
+@app.on_event("shutdown")
+async def shutdown_email_sender():
+    await email_sender.stop()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+
+@app.on_event("shutdown")
+async def shutdown_password_hasher():
+    password_hasher.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="School Work Organizer backend maintenance")
+    parser.add_argument("--check-indexes", action="store_true", help="report missing indexes and slow query plans")
+    parser.add_argument("--slow-ms", type=int, default=100, help="explain time that counts as slow")
+    parser.add_argument("--rebuild-stats", action="store_true", help="recompute every student's progress counters")
+    args = parser.parse_args()
+    
+    if args.check_indexes:
+        sys.exit(0 if asyncio.run(check_indexes(args.slow_ms)) else 1)
+    if args.rebuild_stats:
+        print(f"Rebuilt stats for {asyncio.run(rebuild_student_stats())} students")
+        sys.exit(0)
+    parser.print_help()
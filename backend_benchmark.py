@@ -0,0 +1,726 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the School Work Organizer backend
+
+  auth             p50/p99 latency of authenticated reads against a running server.
+                   Compare the principal cache by running the server once with the
+                   defaults and once with PRINCIPAL_CACHE_SIZE=0.
+  parent-students  the /api/parent/students counter read against the old per-student
+                   query loop, run directly against MONGO_URL in a scratch database.
+  payload          response sizes of full, compact and field-selected task lists for a
+                   student with a large task history, against a running server.
+  serialization    time to serialize 1k task documents through the Pydantic models and
+                   jsonable_encoder versus straight through orjson (no server needed).
+  push             holds thousands of idle /api/events subscribers open against a
+                   running server and measures end-to-end fan-out latency of task events.
+  suite            starts server.py itself against a local mongod (MONGO_URL) or an
+                   in-memory Motor stand-in (mongomock-motor), seeds classes of students
+                   with linked parents and thousands of tasks, runs the login storm,
+                   dashboard, task toggle and parent dashboard scenarios and writes
+                   p50/p95/p99 latency and RPS as JSON. The stand-in does not implement
+                   every aggregation stage; requests that hit one are counted as errors.
+  email            messages per second through a local SMTP sink: one connection per
+                   message (what a drop-in smtplib call would do) versus the pooled,
+                   batching email sender with EMAIL_TRANSPORT=smtp.
+  compare          diffs two suite JSON files, e.g. from two commits.
+  serve            runs server.py in-process (used by suite for the in-memory store).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import smtplib
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+# Backend URL from environment
+BASE_URL = os.environ.get("BACKEND_URL", "http://localhost:8001") + "/api"
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+
+
+def import_server(db_name):
+    """Import backend/server.py bound to a scratch database"""
+    os.environ["DB_NAME"] = db_name
+    sys.path.insert(0, BACKEND_DIR)
+    import server
+    return server
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name, samples, elapsed, errors=0):
+    """Build a result row in milliseconds"""
+    return {
+        "scenario": name,
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+async def register_student(client):
+    """Register a throwaway student and return its auth headers"""
+    payload = {
+        "email": f"bench_{uuid.uuid4().hex[:8]}@school.edu",
+        "name": "Benchmark Student",
+        "password": "BenchPass123!",
+        "role": "student"
+    }
+    response = await client.post(f"{BASE_URL}/auth/register", json=payload)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def seed_tasks(client, headers, count, description=None, concurrency=10):
+    """Create tasks for the benchmark student"""
+    subjects = (await client.get(f"{BASE_URL}/subjects", headers=headers)).json()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(i):
+        async with semaphore:
+            await client.post(f"{BASE_URL}/tasks", headers=headers, json={
+                "title": f"Benchmark task {i}",
+                "description": description,
+                "subject_id": subjects[i % len(subjects)]["id"],
+                "priority": "medium"
+            })
+
+    await asyncio.gather(*(create(i) for i in range(count)))
+
+
+async def measure(client, name, path, headers, requests_total, concurrency):
+    """Issue GET requests with bounded concurrency and record latencies"""
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(f"{BASE_URL}{path}", headers=headers)
+            samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests_total)))
+    return summarize(name, samples, time.perf_counter() - start)
+
+
+async def run_auth_benchmark(args):
+    """p50/p99 for /api/tasks and /api/auth/me"""
+    async with httpx.AsyncClient(timeout=30) as client:
+        headers = await register_student(client)
+        await seed_tasks(client, headers, args.tasks)
+        results = []
+        for name, path in (("tasks", "/tasks"), ("auth_me", "/auth/me")):
+            results.append(await measure(client, name, path, headers, args.requests, args.concurrency))
+        return results
+
+
+async def run_payload_benchmark(args):
+    """Bytes on the wire for each list view of a large task history"""
+    async with httpx.AsyncClient(timeout=60) as client:
+        headers = await register_student(client)
+        await seed_tasks(client, headers, args.tasks, description="Read the chapter and answer the review questions. " * 8)
+        results = []
+        views = (
+            ("full", {"view": "full"}),
+            ("compact", {}),
+            ("fields", {"fields": "id,title,completed"}),
+        )
+        for name, params in views:
+            samples = []
+            sizes = []
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                call_start = time.perf_counter()
+                response = await client.get(f"{BASE_URL}/tasks", headers=headers,
+                                            params={**params, "limit": args.tasks})
+                samples.append(time.perf_counter() - call_start)
+                response.raise_for_status()
+                sizes.append(len(response.content))
+            row = summarize(f"tasks_{name}", samples, time.perf_counter() - start)
+            row["payload_bytes"] = max(sizes)
+            results.append(row)
+        return results
+
+
+async def legacy_student_summaries(db, student_ids):
+    """The pre-aggregation implementation: two full fetches per student"""
+    students = await db.users.find({"id": {"$in": student_ids}, "role": "student"}).to_list(1000)
+    result = []
+    for student in students:
+        tasks = await db.tasks.find({"student_id": student["id"]}).to_list(1000)
+        projects = await db.projects.find({"student_id": student["id"]}).to_list(1000)
+        completed_tasks = len([t for t in tasks if t["completed"]])
+        result.append({
+            "student": {"id": student["id"], "name": student["name"], "email": student["email"]},
+            "stats": {
+                "total_tasks": len(tasks),
+                "completed_tasks": completed_tasks,
+                "pending_tasks": len(tasks) - completed_tasks,
+                "total_projects": len(projects)
+            }
+        })
+    return result
+
+
+async def seed_students(db, count, tasks_per_student, projects_per_student):
+    """Insert students with tasks and projects directly into Mongo"""
+    student_ids = []
+    for i in range(count):
+        student_id = str(uuid.uuid4())
+        student_ids.append(student_id)
+        await db.users.insert_one({
+            "id": student_id, "email": f"{student_id}@school.edu", "name": f"Student {i}",
+            "role": "student", "hashed_password": "", "created_at": datetime.utcnow(), "is_active": True
+        })
+        if tasks_per_student:
+            await db.tasks.insert_many([{
+                "id": str(uuid.uuid4()), "title": f"Task {j}", "description": "x" * 200,
+                "subject_id": "bench", "student_id": student_id, "completed": j % 3 == 0,
+                "priority": "medium", "created_at": datetime.utcnow()
+            } for j in range(tasks_per_student)])
+        if projects_per_student:
+            await db.projects.insert_many([{
+                "id": str(uuid.uuid4()), "name": f"Project {j}", "subject_id": "bench",
+                "student_id": student_id, "created_at": datetime.utcnow()
+            } for j in range(projects_per_student)])
+    return student_ids
+
+
+async def time_call(func, rounds):
+    """Per-call latencies for an async callable"""
+    samples = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        call_start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - call_start)
+    return samples, time.perf_counter() - start
+
+
+async def run_parent_students_benchmark(args):
+    """Precomputed counters vs. N+1 loop at several students-per-parent sizes"""
+    server = import_server(f"school_work_benchmark_{uuid.uuid4().hex[:8]}")
+    await server.ensure_indexes()
+    results = []
+    try:
+        for count in args.students:
+            await server.db.users.delete_many({})
+            await server.db.tasks.delete_many({})
+            await server.db.projects.delete_many({})
+            await server.db.student_stats.delete_many({})
+            student_ids = await seed_students(server.db, count, args.tasks, args.projects)
+            await server.rebuild_student_stats(student_ids)
+            legacy, legacy_elapsed = await time_call(
+                lambda: legacy_student_summaries(server.db, student_ids), args.rounds)
+            counters, counters_elapsed = await time_call(
+                lambda: server.get_student_summaries(student_ids), args.rounds)
+            results.append(summarize(f"loop_{count}_students", legacy, legacy_elapsed))
+            results.append(summarize(f"counters_{count}_students", counters, counters_elapsed))
+    finally:
+        await server.client.drop_database(server.db.name)
+    return results
+
+
+def run_serialization_benchmark(args):
+    """Per-1k-document serialization cost of the model path and the fast path"""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    server = import_server(os.environ.get("DB_NAME", "school_work_benchmark"))
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+
+    docs = [{
+        "id": str(uuid.uuid4()), "title": f"Task {i}", "description": "Read chapter and take notes " * 4,
+        "subject_id": str(uuid.uuid4()), "student_id": str(uuid.uuid4()), "due_date": datetime.utcnow(),
+        "completed": i % 2 == 0, "priority": "medium", "created_at": datetime.utcnow(), "completed_at": None
+    } for i in range(args.documents)]
+
+    def model_path():
+        return json.dumps(jsonable_encoder([server.Task(**doc) for doc in docs])).encode()
+
+    def fast_path():
+        return orjson.dumps(docs)
+
+    results = []
+    for name, func in (("pydantic_jsonable", model_path), ("orjson_raw", fast_path)):
+        samples = []
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            call_start = time.perf_counter()
+            func()
+            # Normalise to the cost of 1000 documents
+            samples.append((time.perf_counter() - call_start) * 1000 / args.documents)
+        results.append(summarize(f"{name}_per_1k", samples, time.perf_counter() - start))
+    return results
+
+
+async def hold_subscriber(client, headers, arrivals, ready):
+    """Keep one SSE connection open and record when each task.created event arrives"""
+    ticket = (await client.post(f"{BASE_URL}/events/ticket", headers=headers)).json()["ticket"]
+    async with client.stream("GET", f"{BASE_URL}/events", params={"ticket": ticket}) as response:
+        ready.release()
+        async for line in response.aiter_lines():
+            if line == "event: task.created":
+                arrivals.append(time.perf_counter())
+
+
+async def run_push_benchmark(args):
+    """Fan-out latency to many idle subscribers of one student"""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        headers = await register_student(client)
+        subjects = (await client.get(f"{BASE_URL}/subjects", headers=headers)).json()
+
+        arrivals = []
+        ready = asyncio.Semaphore(0)
+        subscribers = [asyncio.create_task(hold_subscriber(client, headers, arrivals, ready))
+                       for _ in range(args.subscribers)]
+        for _ in range(args.subscribers):
+            await ready.acquire()
+
+        samples = []
+        start = time.perf_counter()
+        for i in range(args.events):
+            arrivals.clear()
+            sent = time.perf_counter()
+            await client.post(f"{BASE_URL}/tasks", headers=headers, json={
+                "title": f"Push benchmark task {i}", "subject_id": subjects[0]["id"]
+            })
+            deadline = sent + args.timeout
+            while len(arrivals) < args.subscribers and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            samples.extend(arrival - sent for arrival in arrivals)
+            missing = args.subscribers - len(arrivals)
+            if missing:
+                print(f"event {i}: {missing} subscribers did not receive the event within {args.timeout}s")
+        elapsed = time.perf_counter() - start
+
+        for subscriber in subscribers:
+            subscriber.cancel()
+        await asyncio.gather(*subscribers, return_exceptions=True)
+        return [summarize(f"fanout_{args.subscribers}_subscribers", samples, elapsed)]
+
+
+class SMTPSink:
+    """Minimal local SMTP server that accepts and counts messages.
+
+    Speaks just enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET,
+    NOOP, QUIT); latency adds a per-message delay to mimic a real relay.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.received = 0
+        self.connections = 0
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 sink ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line[:4].upper()
+            if command == b"EHLO":
+                writer.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                while (await reader.readline()) not in (b".\r\n", b""):
+                    pass
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                self.received += 1
+                writer.write(b"250 OK\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+
+async def run_email_benchmark(args):
+    """Per-message connections vs. the pooled batching sender against a local sink"""
+    sink = SMTPSink(args.sink_latency_ms / 1000)
+    port = await sink.start()
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.update({
+        "EMAIL_TRANSPORT": "smtp", "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(port),
+        "EMAIL_CONCURRENCY": str(args.concurrency), "EMAIL_BATCH_SIZE": str(args.batch_size)
+    })
+    server = import_server(os.environ.get("DB_NAME", "school_work_benchmark"))
+    results = []
+    try:
+        def send_with_new_connection(i):
+            with smtplib.SMTP("127.0.0.1", port) as connection:
+                connection.sendmail("bench@school.edu", [f"parent{i}@school.edu"], f"Subject: Update {i}\r\n\r\nTask completed")
+
+        samples = []
+        start = time.perf_counter()
+        for i in range(args.messages):
+            call_start = time.perf_counter()
+            await asyncio.to_thread(send_with_new_connection, i)
+            samples.append(time.perf_counter() - call_start)
+        results.append(summarize("connection_per_message", samples, time.perf_counter() - start))
+
+        server.email_sender.start()
+        samples = []
+
+        async def send_pooled(i):
+            call_start = time.perf_counter()
+            delivered = await server.send_email_notification(f"parent{i}@school.edu", f"Update {i}", "Task completed")
+            samples.append(time.perf_counter() - call_start)
+            return delivered
+
+        connections_before = sink.connections
+        start = time.perf_counter()
+        delivered = await asyncio.gather(*(send_pooled(i) for i in range(args.messages)))
+        elapsed = time.perf_counter() - start
+        await server.email_sender.stop()
+        results.append(summarize(f"pooled_sender_{sink.connections - connections_before}_connections",
+                                 samples, elapsed, errors=delivered.count(False)))
+    finally:
+        await sink.stop()
+    return results
+
+
+def serve(args):
+    """Run server.py in this process, optionally on the in-memory Motor stand-in"""
+    if args.store == "memory":
+        import motor.motor_asyncio
+        import mongomock_motor
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    sys.path.insert(0, BACKEND_DIR)
+    import server
+    import uvicorn
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def start_server(args, db_name, roster_key):
+    """Spawn the serve subcommand and wait until it answers"""
+    env = dict(os.environ, DB_NAME=db_name, ROSTER_IMPORT_KEY=roster_key)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    if args.store == "memory":
+        # The stand-in has no sessions, change streams or TTL monitor
+        env["MONGO_TRANSACTIONS"] = "off"
+        env["PUSH_BACKEND"] = "local"
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve",
+                                "--store", args.store, "--port", str(args.port)], env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{args.port}/metrics", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("server did not start within 30s")
+
+
+async def run_scenario(name, total, concurrency, make_request):
+    """Run make_request(i) total times with bounded concurrency"""
+    samples = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await make_request(i)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(name, samples, time.perf_counter() - start, errors)
+
+
+async def seed_school(client, args, roster_key):
+    """Provision classes of students with linked parents and task histories"""
+    admin = {"X-Admin-Key": roster_key}
+    password = "BenchPass123!"
+    students = []
+    parents = []
+    for class_index in range(args.classes):
+        roster = []
+        for i in range(args.students_per_class):
+            tag = f"c{class_index}s{i}_{uuid.uuid4().hex[:6]}"
+            roster.append({"email": f"student_{tag}@school.edu", "name": f"Student {tag}",
+                           "password": password, "role": "student"})
+            roster.append({"email": f"parent_{tag}@school.edu", "name": f"Parent {tag}",
+                           "password": password, "role": "parent"})
+        response = await client.post(f"{BASE_URL}/auth/register/bulk", headers=admin, json={"users": roster})
+        response.raise_for_status()
+        for user in response.json()["created"]:
+            (students if user["role"] == "student" else parents).append({**user, "password": password})
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def login(user):
+        async with semaphore:
+            response = await client.post(f"{BASE_URL}/auth/login",
+                                         json={"email": user["email"], "password": user["password"]})
+            response.raise_for_status()
+            user["headers"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    await asyncio.gather(*(login(user) for user in students + parents))
+
+    async def link(student, parent):
+        async with semaphore:
+            invite = await client.post(f"{BASE_URL}/invite-parent", headers=student["headers"],
+                                       json={"parent_email": parent["email"]})
+            invite.raise_for_status()
+            await client.post(f"{BASE_URL}/accept-invite", headers=parent["headers"],
+                              params={"invite_code": invite.json()["invite_code"]})
+
+    await asyncio.gather(*(link(student, parent) for student, parent in zip(students, parents)))
+
+    async def seed_student(student):
+        subjects = (await client.get(f"{BASE_URL}/subjects", headers=student["headers"])).json()
+        student["task_ids"] = []
+        for i in range(args.tasks_per_student):
+            async with semaphore:
+                response = await client.post(f"{BASE_URL}/tasks", headers=student["headers"], json={
+                    "title": f"Homework {i}",
+                    "description": "Read the chapter and answer the review questions.",
+                    "subject_id": subjects[i % len(subjects)]["id"],
+                    "priority": random.choice(["low", "medium", "high"])
+                })
+                response.raise_for_status()
+                student["task_ids"].append(response.json()["id"])
+
+    await asyncio.gather(*(seed_student(student) for student in students))
+    return students, parents
+
+
+async def run_suite_scenarios(args, roster_key):
+    """Seed a school and run every scenario against it"""
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        seed_start = time.perf_counter()
+        students, parents = await seed_school(client, args, roster_key)
+        print(f"Seeded {len(students)} students, {len(parents)} parents and "
+              f"{len(students) * args.tasks_per_student} tasks in {time.perf_counter() - seed_start:.1f}s")
+
+        users = students + parents
+        toggles = {}
+
+        async def login_storm(i):
+            user = users[i % len(users)]
+            return await client.post(f"{BASE_URL}/auth/login",
+                                     json={"email": user["email"], "password": user["password"]})
+
+        async def dashboard(i):
+            student = students[i % len(students)]
+            return await client.get(f"{BASE_URL}/dashboard", headers=student["headers"])
+
+        async def task_toggle(i):
+            student = students[i % len(students)]
+            task_id = random.choice(student["task_ids"])
+            toggles[task_id] = not toggles.get(task_id, False)
+            return await client.put(f"{BASE_URL}/tasks/{task_id}", headers=student["headers"],
+                                    json={"completed": toggles[task_id]})
+
+        async def parent_dashboard(i):
+            parent = parents[i % len(parents)]
+            return await client.get(f"{BASE_URL}/parent/students", headers=parent["headers"])
+
+        results = []
+        scenarios = (
+            ("login_storm", login_storm),
+            ("dashboard", dashboard),
+            ("task_toggle", task_toggle),
+            ("parent_dashboard", parent_dashboard),
+        )
+        for name, make_request in scenarios:
+            if args.scenarios and name not in args.scenarios:
+                continue
+            results.append(await run_scenario(name, args.requests, args.concurrency, make_request))
+        return results
+
+
+def git_commit():
+    """Current commit, so result files can be matched to the code they measured"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    """Start a server, seed it, run the scenarios and write the JSON report"""
+    global BASE_URL
+    BASE_URL = f"http://127.0.0.1:{args.port}/api"
+    db_name = f"school_work_benchmark_{uuid.uuid4().hex[:8]}"
+    roster_key = uuid.uuid4().hex
+    process = start_server(args, db_name, roster_key)
+    try:
+        results = asyncio.run(run_suite_scenarios(args, roster_key))
+    finally:
+        process.terminate()
+        process.wait()
+        if args.store == "mongod":
+            import pymongo
+            pymongo.MongoClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017")).drop_database(db_name)
+
+    report = {
+        "commit": git_commit(),
+        "generated_at": datetime.utcnow().isoformat(),
+        "store": args.store,
+        "config": {
+            "classes": args.classes,
+            "students_per_class": args.students_per_class,
+            "tasks_per_student": args.tasks_per_student,
+            "requests": args.requests,
+            "concurrency": args.concurrency
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return results
+
+
+def compare_reports(args):
+    """Print per-scenario deltas between two suite reports"""
+    with open(args.baseline) as f:
+        baseline = {row["scenario"]: row for row in json.load(f)["results"]}
+    with open(args.candidate) as f:
+        candidate = {row["scenario"]: row for row in json.load(f)["results"]}
+
+    print(f"{'scenario':<20}{'metric':>8}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name in candidate:
+        if name not in baseline:
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            before, after = baseline[name][metric], candidate[name][metric]
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"{name:<20}{metric:>8}{before:>12}{after:>12}{change:>10}")
+
+
+def print_results(results):
+    """Print a result table"""
+    print(f"{'scenario':<32}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'bytes':>12}")
+    for row in results:
+        print(f"{row['scenario']:<32}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row.get('payload_bytes', ''):>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    auth_parser = subparsers.add_parser("auth", help="authenticated read latency")
+    auth_parser.add_argument("--requests", type=int, default=500)
+    auth_parser.add_argument("--concurrency", type=int, default=20)
+    auth_parser.add_argument("--tasks", type=int, default=50)
+
+    parent_parser = subparsers.add_parser("parent-students", help="parent dashboard summaries")
+    parent_parser.add_argument("--students", type=int, nargs="+", default=[1, 10, 100])
+    parent_parser.add_argument("--tasks", type=int, default=300, help="tasks per student")
+    parent_parser.add_argument("--projects", type=int, default=10, help="projects per student")
+    parent_parser.add_argument("--rounds", type=int, default=20)
+
+    payload_parser = subparsers.add_parser("payload", help="list view payload sizes")
+    payload_parser.add_argument("--tasks", type=int, default=1000)
+    payload_parser.add_argument("--rounds", type=int, default=20)
+
+    serialization_parser = subparsers.add_parser("serialization", help="list response serialization")
+    serialization_parser.add_argument("--documents", type=int, default=1000)
+    serialization_parser.add_argument("--rounds", type=int, default=50)
+
+    push_parser = subparsers.add_parser("push", help="SSE fan-out to idle subscribers")
+    push_parser.add_argument("--subscribers", type=int, default=2000)
+    push_parser.add_argument("--events", type=int, default=20)
+    push_parser.add_argument("--timeout", type=float, default=10.0, help="seconds to wait for each fan-out")
+
+    suite_parser = subparsers.add_parser("suite", help="self-hosted load test with JSON output")
+    suite_parser.add_argument("--store", choices=["mongod", "memory"], default="mongod")
+    suite_parser.add_argument("--port", type=int, default=8765)
+    suite_parser.add_argument("--classes", type=int, default=3)
+    suite_parser.add_argument("--students-per-class", type=int, default=25)
+    suite_parser.add_argument("--tasks-per-student", type=int, default=40)
+    suite_parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    suite_parser.add_argument("--concurrency", type=int, default=20)
+    suite_parser.add_argument("--scenarios", nargs="*", help="subset of scenarios to run")
+    suite_parser.add_argument("--output", help="write the JSON report here")
+
+    email_parser = subparsers.add_parser("email", help="SMTP delivery throughput")
+    email_parser.add_argument("--messages", type=int, default=2000)
+    email_parser.add_argument("--concurrency", type=int, default=10, help="EMAIL_CONCURRENCY for the pooled sender")
+    email_parser.add_argument("--batch-size", type=int, default=50, help="EMAIL_BATCH_SIZE for the pooled sender")
+    email_parser.add_argument("--sink-latency-ms", type=float, default=0.0, help="per-message delay in the sink")
+
+    compare_parser = subparsers.add_parser("compare", help="diff two suite reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+
+    serve_parser = subparsers.add_parser("serve", help="run server.py in-process")
+    serve_parser.add_argument("--store", choices=["mongod", "memory"], default="mongod")
+    serve_parser.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "auth":
+        print(f"Benchmarking against: {BASE_URL}")
+        print_results(asyncio.run(run_auth_benchmark(args)))
+    elif args.benchmark == "parent-students":
+        print_results(asyncio.run(run_parent_students_benchmark(args)))
+    elif args.benchmark == "payload":
+        print(f"Benchmarking against: {BASE_URL}")
+        print_results(asyncio.run(run_payload_benchmark(args)))
+    elif args.benchmark == "serialization":
+        print_results(run_serialization_benchmark(args))
+    elif args.benchmark == "push":
+        print(f"Benchmarking against: {BASE_URL}")
+        print_results(asyncio.run(run_push_benchmark(args)))
+    elif args.benchmark == "suite":
+        print_results(run_suite(args))
+    elif args.benchmark == "email":
+        print_results(asyncio.run(run_email_benchmark(args)))
+    elif args.benchmark == "compare":
+        compare_reports(args)
+    elif args.benchmark == "serve":
+        serve(args)
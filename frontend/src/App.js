@@ -6,6 +6,124 @@ import axios from "axios";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Follow X-Next-Cursor headers until a paginated list is exhausted
+const fetchAllPages = async (url, startCursor = null) => {
+  const items = [];
+  let cursor = startCursor;
+  do {
+    const response = await axios.get(url, { params: cursor ? { cursor } : {} });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+};
+
+// Keep the access token and its rotating refresh token together
+const storeTokens = ({ access_token, refresh_token }) => {
+  localStorage.setItem('token', access_token);
+  localStorage.setItem('refreshToken', refresh_token);
+  axios.defaults.headers.common['Authorization'] = `Bearer ${access_token}`;
+};
+
+const clearTokens = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('refreshToken');
+  delete axios.defaults.headers.common['Authorization'];
+};
+
+// Swap an expired access token for a new one instead of sending the user back to login.
+// Concurrent 401s share a single refresh so the token is only rotated once.
+let refreshing = null;
+
+const refreshTokens = () => {
+  if (!refreshing) {
+    const refresh_token = localStorage.getItem('refreshToken');
+    refreshing = axios.post(`${API}/auth/refresh`, { refresh_token })
+      .then((response) => {
+        storeTokens(response.data);
+        window.dispatchEvent(new Event('tokens-refreshed'));
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+axios.interceptors.response.use(undefined, async (error) => {
+  const { config, response } = error;
+  if (response?.status !== 401 || config._retried || config.url.includes('/auth/') || !localStorage.getItem('refreshToken')) {
+    throw error;
+  }
+  config._retried = true;
+  let access_token;
+  try {
+    access_token = await refreshTokens();
+  } catch (refreshError) {
+    clearTokens();
+    throw error;
+  }
+  config.headers['Authorization'] = `Bearer ${access_token}`;
+  return axios(config);
+});
+
+// Subscribe to server-sent events for the signed-in user.
+// The server ends the stream when the access token behind it expires, and EventSource
+// would retry with the same stale URL, so every (re)connect asks for a fresh ticket.
+const useEventStream = (handlers) => {
+  useEffect(() => {
+    if (!localStorage.getItem('token')) return undefined;
+    let source = null;
+    let retryTimer = null;
+    let stopped = false;
+    let connected = false;
+    let attempt = 0;
+
+    const connect = async () => {
+      // A newer attempt (e.g. after a token refresh) supersedes any in flight
+      const current = ++attempt;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+      const retry = () => {
+        if (!stopped && current === attempt && localStorage.getItem('token')) retryTimer = setTimeout(connect, 5000);
+      };
+      let ticket;
+      try {
+        // Goes through axios so an expired access token is refreshed first
+        ({ data: { ticket } } = await axios.post(`${API}/events/ticket`));
+      } catch (error) {
+        retry();
+        return;
+      }
+      if (stopped || current !== attempt) return;
+      const stream = new EventSource(`${API}/events?ticket=${encodeURIComponent(ticket)}`);
+      source = stream;
+      Object.entries(handlers).forEach(([type, handler]) => {
+        stream.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+      });
+      stream.onopen = () => {
+        // Events published while disconnected are lost, so reload after a reconnect
+        if (connected && handlers.resync) handlers.resync({});
+        connected = true;
+      };
+      stream.onerror = () => {
+        stream.close();
+        retry();
+      };
+    };
+
+    connect();
+    window.addEventListener('tokens-refreshed', connect);
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      window.removeEventListener('tokens-refreshed', connect);
+      if (source) source.close();
+    };
+  }, []); // eslint-disable-line react-hooks/exhaustive-deps
+};
+
 // Context for authentication
 const AuthContext = createContext();
 
@@ -33,11 +151,17 @@ const AuthProvider = ({ children }) => {
 
   const fetchUserInfo = async () => {
     try {
-      const response = await axios.get(`${API}/auth/me`);
+      let response;
+      try {
+        response = await axios.get(`${API}/auth/me`);
+      } catch (error) {
+        if (error.response?.status !== 401 || !localStorage.getItem('refreshToken')) throw error;
+        await refreshTokens();
+        response = await axios.get(`${API}/auth/me`);
+      }
       setUser(response.data);
     } catch (error) {
-      localStorage.removeItem('token');
-      delete axios.defaults.headers.common['Authorization'];
+      clearTokens();
     } finally {
       setLoading(false);
     }
@@ -46,11 +170,8 @@ const AuthProvider = ({ children }) => {
   const login = async (email, password) => {
     try {
       const response = await axios.post(`${API}/auth/login`, { email, password });
-      const { access_token, user: userData } = response.data;
-      
-      localStorage.setItem('token', access_token);
-      axios.defaults.headers.common['Authorization'] = `Bearer ${access_token}`;
-      setUser(userData);
+      storeTokens(response.data);
+      setUser(response.data.user);
       
       return { success: true };
     } catch (error) {
@@ -61,11 +182,8 @@ const AuthProvider = ({ children }) => {
   const register = async (email, name, password, role) => {
     try {
       const response = await axios.post(`${API}/auth/register`, { email, name, password, role });
-      const { access_token, user: userData } = response.data;
-      
-      localStorage.setItem('token', access_token);
-      axios.defaults.headers.common['Authorization'] = `Bearer ${access_token}`;
-      setUser(userData);
+      storeTokens(response.data);
+      setUser(response.data.user);
       
       return { success: true };
     } catch (error) {
@@ -74,8 +192,11 @@ const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
-    localStorage.removeItem('token');
-    delete axios.defaults.headers.common['Authorization'];
+    const refresh_token = localStorage.getItem('refreshToken');
+    if (refresh_token) {
+      axios.post(`${API}/auth/logout`, { refresh_token }).catch(() => {});
+    }
+    clearTokens();
     setUser(null);
   };
 
@@ -224,45 +345,46 @@ const StudentDashboard = () => {
   const { user, logout } = useAuth();
 
   useEffect(() => {
-    fetchTasks();
-    fetchProjects();
-    fetchSubjects();
-    fetchNotifications();
+    fetchDashboard();
   }, []);
 
-  const fetchTasks = async () => {
-    try {
-      const response = await axios.get(`${API}/tasks`);
-      setTasks(response.data);
-    } catch (error) {
-      console.error('Failed to fetch tasks:', error);
-    }
-  };
+  useEventStream({
+    'task.created': (task) => setTasks(prev => prev.some(t => t.id === task.id) ? prev : [...prev, task]),
+    'task.updated': (task) => setTasks(prev => prev.map(t => (t.id === task.id ? task : t))),
+    'task.deleted': ({ id }) => setTasks(prev => prev.filter(t => t.id !== id)),
+    'notification.created': (notification) => setNotifications(prev => [notification, ...prev]),
+    'resync': () => fetchDashboard(),
+  });
 
-  const fetchProjects = async () => {
+  const fetchDashboard = async () => {
     try {
-      const response = await axios.get(`${API}/projects`);
-      setProjects(response.data);
+      const { data } = await axios.get(`${API}/dashboard`, { params: { view: 'full' } });
+      setSubjects(data.subjects);
+      setNotifications(data.notifications);
+      setTasks(data.cursors.tasks
+        ? [...data.tasks, ...await fetchAllPages(`${API}/tasks?view=full`, data.cursors.tasks)]
+        : data.tasks);
+      setProjects(data.cursors.projects
+        ? [...data.projects, ...await fetchAllPages(`${API}/projects?view=full`, data.cursors.projects)]
+        : data.projects);
     } catch (error) {
-      console.error('Failed to fetch projects:', error);
+      console.error('Failed to fetch dashboard:', error);
     }
   };
 
-  const fetchSubjects = async () => {
+  const fetchTasks = async () => {
     try {
-      const response = await axios.get(`${API}/subjects`);
-      setSubjects(response.data);
+      setTasks(await fetchAllPages(`${API}/tasks?view=full`));
     } catch (error) {
-      console.error('Failed to fetch subjects:', error);
+      console.error('Failed to fetch tasks:', error);
     }
   };
 
-  const fetchNotifications = async () => {
+  const fetchProjects = async () => {
     try {
-      const response = await axios.get(`${API}/notifications`);
-      setNotifications(response.data);
+      setProjects(await fetchAllPages(`${API}/projects?view=full`));
     } catch (error) {
-      console.error('Failed to fetch notifications:', error);
+      console.error('Failed to fetch projects:', error);
     }
   };
 
@@ -797,7 +919,7 @@ const ProjectKanban = ({ project, onBack }) => {
   const fetchProjectTasks = async () => {
     try {
       console.log('Fetching tasks for project:', project.id);
-      const response = await axios.get(`${API}/projects/${project.id}/tasks`);
+      const response = await axios.get(`${API}/projects/${project.id}/tasks`, { params: { view: 'full' } });
       console.log('Project tasks response:', response.data);
       setTasks(response.data);
     } catch (error) {
@@ -1082,12 +1204,21 @@ const ParentDashboard = () => {
   const [students, setStudents] = useState([]);
   const [inviteCode, setInviteCode] = useState('');
   const [message, setMessage] = useState('');
+  const [frequency, setFrequency] = useState('immediate');
   const { user, logout } = useAuth();
 
   useEffect(() => {
     fetchStudents();
+    fetchPreferences();
   }, []);
 
+  useEventStream({
+    'task.created': () => fetchStudents(),
+    'task.updated': () => fetchStudents(),
+    'task.deleted': () => fetchStudents(),
+    'resync': () => fetchStudents(),
+  });
+
   const fetchStudents = async () => {
     try {
       const response = await axios.get(`${API}/parent/students`);
@@ -1097,6 +1228,24 @@ const ParentDashboard = () => {
     }
   };
 
+  const fetchPreferences = async () => {
+    try {
+      const response = await axios.get(`${API}/notification-preferences`);
+      setFrequency(response.data.notification_frequency);
+    } catch (error) {
+      console.error('Failed to fetch notification preferences:', error);
+    }
+  };
+
+  const updateFrequency = async (value) => {
+    try {
+      await axios.put(`${API}/notification-preferences`, { notification_frequency: value });
+      setFrequency(value);
+    } catch (error) {
+      console.error('Failed to update notification preferences:', error);
+    }
+  };
+
   const handleAcceptInvite = async (e) => {
     e.preventDefault();
     try {
@@ -1125,6 +1274,15 @@ const ParentDashboard = () => {
             </div>
             
             <div className="flex items-center space-x-4">
+              <select
+                value={frequency}
+                onChange={(e) => updateFrequency(e.target.value)}
+                className="text-sm border border-purple-200 rounded-lg px-2 py-1 text-gray-700"
+              >
+                <option value="immediate">Updates: immediately</option>
+                <option value="hourly">Updates: hourly summary</option>
+                <option value="daily">Updates: daily summary</option>
+              </select>
               <span className="text-sm text-gray-600">Welcome, {user.name}</span>
               <button
                 onClick={logout}
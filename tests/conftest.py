@@ -0,0 +1,169 @@
+import asyncio
+import os
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "school_work_test")
+os.environ.setdefault("MONGO_TRANSACTIONS", "off")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """Runs a coroutine to completion on a private event loop."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def db(monkeypatch, run):
+    """Points server.db at a fresh in-memory database with the API's indexes."""
+    database = AsyncMongoMockClient()["school_work_test"]
+    monkeypatch.setattr(server, "db", database)
+    run(server.ensure_indexes())
+    return database
+
+
+@pytest.fixture
+def student(db, run):
+    """A student account stored in the test database."""
+    user = server.User(email="sam@example.com", name="Sam", role="student", hashed_password="x")
+    run(db.users.insert_one(user.dict()))
+    return user
+
+
+@pytest.fixture
+def parent(db, run, student):
+    """A parent account linked to the student fixture."""
+    user = server.User(email="pat@example.com", name="Pat", role="parent", hashed_password="x")
+    run(db.users.insert_one(user.dict()))
+    run(db.parent_student_relations.insert_one({"parent_id": user.id, "student_id": student.id}))
+    return user
+
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    """Records notification emails instead of handing them to the email sender."""
+    sent = []
+
+    async def send_email_notification(to_email, subject, body):
+        sent.append((to_email, subject, body))
+        return True
+
+    monkeypatch.setattr(server, "send_email_notification", send_email_notification)
+    return sent
+
+
+class SMTPSink:
+    """Local SMTP server on a background thread that records what it receives.
+
+    Speaks just enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET,
+    NOOP, QUIT). Recipients listed in reject are refused with a 550 that many
+    times, and drop_connections() closes every open session from the server
+    side, like a relay timing out idle clients.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.reject = {}
+        self._sessions = set()
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                sink.handle(self)
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.drop_connections()
+
+    def drop_connections(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, set()
+        for connection in sessions:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def recipients(self):
+        return [recipient for recipients, _ in self.messages for recipient in recipients]
+
+    def handle(self, handler):
+        with self._lock:
+            self.connections += 1
+            self._sessions.add(handler.connection)
+        reply = handler.wfile.write
+        recipients = []
+        try:
+            reply(b"220 sink ESMTP\r\n")
+            for line in handler.rfile:
+                command = line[:4].upper()
+                if command == b"EHLO":
+                    reply(b"250-sink\r\n250 8BITMIME\r\n")
+                elif command == b"RCPT":
+                    recipient = line.decode().split("<", 1)[1].split(">", 1)[0]
+                    with self._lock:
+                        refused = self.reject.get(recipient, 0) > 0
+                        if refused:
+                            self.reject[recipient] -= 1
+                    if refused:
+                        reply(b"550 Mailbox unavailable\r\n")
+                    else:
+                        recipients.append(recipient)
+                        reply(b"250 OK\r\n")
+                elif command == b"DATA":
+                    reply(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    data = b""
+                    while (chunk := handler.rfile.readline()) != b".\r\n":
+                        if not chunk:
+                            return
+                        data += chunk
+                    with self._lock:
+                        self.messages.append((recipients, data))
+                    recipients = []
+                    reply(b"250 OK\r\n")
+                elif command == b"RSET":
+                    recipients = []
+                    reply(b"250 OK\r\n")
+                elif command == b"QUIT":
+                    reply(b"221 Bye\r\n")
+                    return
+                else:
+                    reply(b"250 OK\r\n")
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._sessions.discard(handler.connection)
+
+
+@pytest.fixture
+def smtp_sink():
+    """A running SMTPSink, stopped after the test."""
+    sink = SMTPSink()
+    sink.start()
+    yield sink
+    sink.stop()
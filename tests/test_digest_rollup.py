@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import server
+
+
+class FakeClock(datetime):
+    now = datetime(2026, 3, 2, 10, 15)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now
+
+
+def item(parent, name, created_at):
+    return {"id": name, "parent_id": parent.id, "frequency": "hourly", "line": f"Sam: {name}", "created_at": created_at}
+
+
+def digests(run, db):
+    return run(db.notifications.find({"type": "digest"}, {"_id": 0}).sort("created_at", 1).to_list(None))
+
+
+def test_buffered_items_roll_up_once_their_period_ends(db, run, parent, sent_emails, monkeypatch):
+    monkeypatch.setattr(server, "datetime", FakeClock)
+    essay = item(parent, "Essay done", datetime(2026, 3, 2, 10, 5))
+    run(server.buffer_digest_items([essay, item(parent, "Lab done", datetime(2026, 3, 2, 10, 10))]))
+    # A re-delivered outbox entry buffers the same item again
+    run(server.buffer_digest_items([dict(essay)]))
+    assert run(db.notification_digests.count_documents({})) == 2
+
+    monkeypatch.setattr(FakeClock, "now", datetime(2026, 3, 2, 10, 45))
+    run(server.digest_rollup.run_once())
+    assert digests(run, db) == []
+
+    monkeypatch.setattr(FakeClock, "now", datetime(2026, 3, 2, 11, 5))
+    run(server.digest_rollup.run_once())
+    run(server.digest_rollup.run_once())
+    [digest] = digests(run, db)
+    assert (digest["user_id"], digest["message"]) == (parent.id, "Sam: Essay done\nSam: Lab done")
+    assert sent_emails == [(parent.email, "School Work Hourly summary", digest["message"])]
+    assert run(db.notification_digests.count_documents({})) == 0
+
+
+def test_late_items_go_into_the_next_summary(db, run, parent, sent_emails, monkeypatch):
+    monkeypatch.setattr(server, "datetime", FakeClock)
+    run(server.buffer_digest_items([item(parent, "Essay done", datetime(2026, 3, 2, 10, 5))]))
+    monkeypatch.setattr(FakeClock, "now", datetime(2026, 3, 2, 11, 5))
+    run(server.digest_rollup.run_once())
+
+    # An update from the 10:00 hour delivered after that hour was summarised
+    monkeypatch.setattr(FakeClock, "now", datetime(2026, 3, 2, 11, 6))
+    run(server.buffer_digest_items([item(parent, "Lab done", datetime(2026, 3, 2, 10, 55))]))
+    monkeypatch.setattr(FakeClock, "now", datetime(2026, 3, 2, 11, 30))
+    run(server.digest_rollup.run_once())
+    assert [digest["message"] for digest in digests(run, db)] == ["Sam: Essay done"]
+
+    monkeypatch.setattr(FakeClock, "now", datetime(2026, 3, 2, 12, 1))
+    run(server.digest_rollup.run_once())
+    assert [digest["message"] for digest in digests(run, db)] == ["Sam: Essay done", "Sam: Lab done"]
+    assert len(sent_emails) == 2
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import server
+
+
+class FakeClock(datetime):
+    now = datetime(2026, 3, 2, 9, 0)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now
+
+
+def test_overdue_reminder_fires_once_the_due_date_has_passed(db, run, monkeypatch):
+    monkeypatch.setattr(server, "datetime", FakeClock)
+    start = FakeClock.now
+    run(db.users.insert_one({"id": "student-1", "name": "Sam", "role": "student"}))
+    run(db.tasks.insert_one({
+        "id": "task-1",
+        "title": "Essay",
+        "student_id": "student-1",
+        "completed": False,
+        "due_date": start + timedelta(hours=2),
+        "created_at": start - timedelta(days=1),
+    }))
+    scheduler = server.DueReminderScheduler(60, 900)
+
+    assert run(scheduler.acquire_lease())
+    run(scheduler.run_once())
+    state = run(db.scheduler_state.find_one({"_id": scheduler.name}))
+    assert set(state["watermarks"]) == {"task_due", "task_overdue"}
+    assert run(db.notifications.count_documents({"type": "task_overdue"})) == 0
+
+    monkeypatch.setattr(FakeClock, "now", start + timedelta(hours=3))
+    run(scheduler.run_once())
+    overdue = run(db.notifications.find({"type": "task_overdue"}, {"_id": 0}).to_list(None))
+    assert [n["user_id"] for n in overdue] == ["student-1"]
+    assert run(db.notifications.count_documents({"type": "task_due"})) == 1
+
+    # A later run does not notify about the same task again
+    monkeypatch.setattr(FakeClock, "now", start + timedelta(hours=4))
+    run(scheduler.run_once())
+    assert run(db.notifications.count_documents({"type": "task_overdue"})) == 1
+
+
+def test_due_dates_edited_into_a_scanned_window_are_rescanned(db, run, monkeypatch, student):
+    monkeypatch.setattr(server, "datetime", FakeClock)
+    start = FakeClock.now
+    tasks = [
+        run(server.create_task(server.TaskCreate(title=title, subject_id="history", due_date=start + timedelta(days=7)), current_user=student))
+        for title in ("Essay", "Lab report")
+    ]
+    scheduler = server.DueReminderScheduler(60, 900)
+    assert run(scheduler.acquire_lease())
+    run(scheduler.run_once())
+    assert run(db.notifications.count_documents({})) == 0
+
+    # Both new due dates fall inside ranges the previous run already scanned
+    monkeypatch.setattr(FakeClock, "now", start + timedelta(minutes=5))
+    run(server.update_task(tasks[0].id, server.TaskUpdate(due_date=start + timedelta(hours=2)), current_user=student))
+    batch = server.TaskBatch(operations=[
+        server.TaskBatchOperation(id=tasks[1].id, op="update", due_date=start - timedelta(hours=1))
+    ])
+    run(server.batch_update_tasks(batch, current_user=student))
+    monkeypatch.setattr(FakeClock, "now", start + timedelta(minutes=10))
+    run(scheduler.run_once())
+
+    notifications = run(db.notifications.find({}, {"_id": 0, "type": 1, "message": 1}).to_list(None))
+    assert sorted((n["type"], n["message"].split(" ")[0]) for n in notifications) == [
+        ("task_due", "Essay"), ("task_overdue", "Lab")
+    ]
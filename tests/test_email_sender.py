@@ -0,0 +1,73 @@
+import asyncio
+
+import server
+
+
+def messages(*recipients):
+    return [(recipient, "School Work Update", "Task completed") for recipient in recipients]
+
+
+def transport(sink, pool_size=2):
+    return server.SMTPEmailTransport("127.0.0.1", sink.port, pool_size)
+
+
+def test_batches_reuse_a_pooled_connection(smtp_sink):
+    smtp = transport(smtp_sink)
+
+    assert smtp.send_batch(messages("a@example.com", "b@example.com")) == [True, True]
+    assert smtp.send_batch(messages("c@example.com")) == [True]
+    smtp.close()
+
+    assert smtp_sink.recipients() == ["a@example.com", "b@example.com", "c@example.com"]
+    assert smtp_sink.connections == 1
+
+
+def test_a_stale_pooled_connection_is_replaced(smtp_sink):
+    smtp = transport(smtp_sink)
+    assert smtp.send_batch(messages("a@example.com")) == [True]
+
+    # The relay drops the idle pooled connection between batches
+    smtp_sink.drop_connections()
+    assert smtp.send_batch(messages("b@example.com", "c@example.com")) == [True, True]
+    smtp.close()
+
+    assert smtp_sink.recipients() == ["a@example.com", "b@example.com", "c@example.com"]
+    assert smtp_sink.connections == 2
+
+
+def test_a_refused_recipient_fails_only_its_own_message(smtp_sink):
+    smtp = transport(smtp_sink)
+    smtp_sink.reject["b@example.com"] = 1
+
+    assert smtp.send_batch(messages("a@example.com", "b@example.com", "c@example.com")) == [True, False, True]
+    assert smtp.send_batch(messages("d@example.com")) == [True]
+    smtp.close()
+
+    assert smtp_sink.recipients() == ["a@example.com", "c@example.com", "d@example.com"]
+    assert smtp_sink.connections == 1
+
+
+def test_sender_retries_failed_messages_with_backoff(smtp_sink, run, monkeypatch):
+    monkeypatch.setattr(server, "EMAIL_RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(server, "EMAIL_MAX_RETRIES", 3)
+    smtp_sink.reject.update({"late@example.com": 1, "gone@example.com": 10})
+    delays = []
+
+    class RecordingSender(server.EmailSender):
+        async def _retry(self, item, delay):
+            delays.append((item["message"][0], delay))
+            await super()._retry(item, delay)
+
+    async def send_all():
+        sender = RecordingSender(transport(smtp_sink), 2, 10)
+        sender.start()
+        try:
+            return await asyncio.gather(*(
+                sender.send(*message) for message in messages("ok@example.com", "late@example.com", "gone@example.com")
+            ))
+        finally:
+            await sender.stop()
+
+    assert run(send_all()) == [True, True, False]
+    assert sorted(smtp_sink.recipients()) == ["late@example.com", "ok@example.com"]
+    assert sorted(delays) == [("gone@example.com", 0.01), ("gone@example.com", 0.02), ("late@example.com", 0.01)]
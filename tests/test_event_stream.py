@@ -0,0 +1,42 @@
+import asyncio
+from datetime import timedelta
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import server
+
+
+def access_token(student, minutes=15):
+    return server.create_access_token(server.principal_claims(student), expires_delta=timedelta(minutes=minutes))
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_tickets_only_open_event_streams(db, run, student):
+    token = access_token(student)
+    ticket = run(server.create_event_ticket(bearer(token)))["ticket"]
+
+    assert jwt.decode(ticket, server.SECRET_KEY, algorithms=[server.ALGORITHM])["stream_until"] == \
+        jwt.decode(token, server.SECRET_KEY, algorithms=[server.ALGORITHM])["exp"]
+    with pytest.raises(HTTPException):
+        run(server.authenticate_token(ticket))
+    with pytest.raises(HTTPException):
+        run(server.stream_events(token))
+
+
+def test_stream_ends_when_the_access_token_expires(db, run, student):
+    token = server.create_access_token(server.principal_claims(student), expires_delta=timedelta(seconds=1))
+    ticket = run(server.create_event_ticket(bearer(token)))["ticket"]
+
+    async def read_stream():
+        response = await server.stream_events(ticket)
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = run(asyncio.wait_for(read_stream(), timeout=5))
+    assert chunks == ["retry: 5000\n\n"]
+    assert not server.event_hub.subscribers.get(student.id)
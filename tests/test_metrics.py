@@ -0,0 +1,18 @@
+from fastapi.testclient import TestClient
+
+import server
+
+
+def test_metrics_are_disabled_without_a_token(monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", None)
+    assert TestClient(server.app).get("/metrics").status_code == 404
+
+
+def test_metrics_require_the_configured_token(monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "scrape-secret")
+    client = TestClient(server.app)
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "# TYPE" in response.text
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import server
+
+
+def test_claimed_entries_are_leased_until_they_expire(db, run, student):
+    dispatcher = server.NotificationDispatcher(1, 10)
+    run(dispatcher.enqueue(student.id, "Task completed: Essay"))
+
+    claim, entries = run(dispatcher.claim_batch())
+    assert [(entry["status"], entry["attempts"]) for entry in entries] == [("processing", 1)]
+    assert run(dispatcher.claim_batch()) == (None, [])
+
+    # Another worker reclaims the entry once the lease has run out
+    run(db.notification_outbox.update_one({"claim": claim}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}}))
+    new_claim, entries = run(dispatcher.claim_batch())
+    assert new_claim != claim
+    assert [entry["attempts"] for entry in entries] == [2]
+
+
+def test_redelivered_entries_do_not_duplicate_notifications(db, run, parent, student, sent_emails):
+    dispatcher = server.NotificationDispatcher(1, 10)
+    run(dispatcher.enqueue(student.id, "Task completed: Essay"))
+    run(dispatcher.process_batch())
+    # As if the worker died after fanning out but before marking the entry done
+    run(db.notification_outbox.update_many({}, {"$set": {"status": "pending"}}))
+    run(dispatcher.process_batch())
+
+    notifications = run(db.notifications.find({"user_id": parent.id}, {"_id": 0, "message": 1}).to_list(None))
+    assert notifications == [{"message": "Sam: Task completed: Essay"}]
+    assert run(db.notification_outbox.distinct("status")) == ["done"]
+
+
+def test_a_failing_entry_does_not_hold_back_its_batch(db, run, parent, student, sent_emails):
+    dispatcher = server.NotificationDispatcher(1, 10)
+    run(dispatcher.enqueue(student.id, "Task completed: Essay"))
+    # An entry the dispatcher cannot render
+    run(db.notification_outbox.insert_one({
+        "id": "broken", "student_id": student.id, "status": "pending", "attempts": 0, "created_at": datetime.utcnow()
+    }))
+    run(dispatcher.process_batch())
+
+    statuses = {entry["id"]: entry["status"] for entry in run(db.notification_outbox.find().to_list(None))}
+    assert statuses.pop("broken") == "processing"
+    assert list(statuses.values()) == ["done"]
+    assert run(db.notifications.count_documents({"user_id": parent.id})) == 1
+
+
+def test_entries_are_dead_lettered_after_the_last_attempt(db, run, student):
+    dispatcher = server.NotificationDispatcher(1, 10)
+    run(db.notification_outbox.insert_one({
+        "id": "poison", "student_id": student.id, "message": "x", "status": "processing",
+        "attempts": server.NOTIFICATION_MAX_ATTEMPTS, "lease_until": datetime.utcnow() - timedelta(seconds=1),
+        "created_at": datetime.utcnow()
+    }))
+
+    assert run(dispatcher.claim_batch()) == (None, [])
+    entry = run(db.notification_outbox.find_one({"id": "poison"}))
+    assert entry["status"] == "failed"
+    assert "lease_until" not in entry
+    assert 'notification_outbox_failed_total 1' in server.metrics.render()
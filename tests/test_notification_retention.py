@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockCollection
+
+import server
+
+
+def store(run, db, user_id, count, **fields):
+    notifications = [
+        server.Notification(
+            user_id=user_id, title="Task", message=f"Task {i}", type="task_update",
+            created_at=datetime(2026, 3, 1) + timedelta(minutes=i), **fields
+        ).dict()
+        for i in range(count)
+    ]
+    run(db.notifications.insert_many(notifications))
+    if not fields.get("read"):
+        run(server.adjust_unread_counts({user_id: count}))
+    return notifications
+
+
+def test_unread_cap_drops_the_oldest_unread_notifications(db, run, student, monkeypatch):
+    monkeypatch.setattr(server, "NOTIFICATION_UNREAD_CAP", 3)
+    notifications = store(run, db, student.id, 5)
+
+    run(server.notification_retention.run_once())
+
+    remaining = run(db.notifications.find({}, {"_id": 0, "message": 1}).sort("created_at", 1).to_list(None))
+    assert [n["message"] for n in remaining] == [n["message"] for n in notifications[2:]]
+    assert run(server.get_unread_notification_count(student.id)) == 3
+
+
+def test_unread_cap_keeps_notifications_read_after_selection(db, run, student, monkeypatch):
+    monkeypatch.setattr(server, "NOTIFICATION_UNREAD_CAP", 3)
+    notifications = store(run, db, student.id, 5)
+    delete_many = AsyncMongoMockCollection.delete_many
+
+    async def racing_delete_many(self, *args, **kwargs):
+        # The user reads the oldest notification between the job's select and delete
+        await server.mark_notification_read(notifications[0]["id"], current_user=student)
+        return await delete_many(self, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncMongoMockCollection, "delete_many", racing_delete_many)
+    run(server.notification_retention.run_once())
+
+    assert run(db.notifications.find_one({"id": notifications[0]["id"]}))["read"]
+    assert run(db.notifications.count_documents({"read": False})) == 3
+    assert run(server.get_unread_notification_count(student.id)) == 3
+
+
+def test_read_notifications_without_read_at_expire(db, run, student):
+    legacy = store(run, db, student.id, 2, read=True)
+    run(db.notifications.update_one({"id": legacy[0]["id"]}, {"$unset": {"read_at": ""}}))
+
+    assert run(server.backfill_read_at()) == 2
+    assert run(db.notifications.count_documents({"read_at": None})) == 0
+
+    # Once a retention period has passed the TTL index removes them
+    expired = datetime.utcnow() - timedelta(seconds=server.NOTIFICATION_READ_RETENTION_SECONDS + 1)
+    run(db.notifications.update_many({}, {"$set": {"read_at": expired}}))
+    assert run(db.notifications.count_documents({})) == 0
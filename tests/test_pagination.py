@@ -0,0 +1,90 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+import server
+
+
+def insert_tasks(run, db):
+    # Five tasks share one timestamp, so the id tiebreaker decides their order
+    tied = datetime(2026, 3, 2, 9, 0)
+    docs = [
+        server.Task(id=f"task-{i:02d}", title=f"Task {i}", subject_id="history", student_id="student-1",
+                    created_at=tied if i < 5 else tied + timedelta(minutes=i)).dict()
+        for i in range(9)
+    ]
+    run(db.tasks.insert_many(docs))
+    return [doc["id"] for doc in docs]
+
+
+def read_all_pages(run, db, limit, direction):
+    ids, cursors, cursor = [], [], None
+    while True:
+        page, cursor = run(server.find_page(db.tasks, {"student_id": "student-1"}, cursor, limit, direction))
+        assert len(page) <= limit
+        ids += [doc["id"] for doc in page]
+        if cursor is None:
+            return ids, cursors
+        cursors.append(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 9, 10])
+def test_pages_cover_every_row_once_across_ties(db, run, limit):
+    expected = insert_tasks(run, db)
+
+    ids, _ = read_all_pages(run, db, limit, ASCENDING)
+    assert ids == expected
+    ids, _ = read_all_pages(run, db, limit, DESCENDING)
+    assert ids == expected[::-1]
+
+
+def test_cursor_is_stable_and_resumes_after_the_last_row(db, run):
+    insert_tasks(run, db)
+    first, cursor = run(server.find_page(db.tasks, {}, None, 3))
+    again, same_cursor = run(server.find_page(db.tasks, {}, None, 3))
+    assert cursor == same_cursor
+    assert [doc["id"] for doc in first] == [doc["id"] for doc in again]
+
+    second, _ = run(server.find_page(db.tasks, {}, cursor, 3))
+    assert second[0]["id"] == "task-03"
+    assert server.decode_cursor(cursor) == (first[-1]["created_at"], first[-1]["id"])
+
+
+def test_last_full_page_has_no_next_cursor(db, run):
+    insert_tasks(run, db)
+    page, cursor = run(server.find_page(db.tasks, {}, None, 9))
+    assert len(page) == 9
+    assert cursor is None
+
+
+def encoded(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    encoded("2026-03-02T09:00:00"),
+    encoded(["yesterday", "task-01"]),
+    encoded([1, "task-01"]),
+    encoded(["2026-03-02T09:00:00", "task-01", "extra"]),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        server.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(HTTPException) as error:
+        server.list_projection(server.Task, fields="title,bogus")
+    assert error.value.status_code == 400
+    assert "bogus" in error.value.detail
+
+
+def test_field_selection_always_includes_the_cursor_keys():
+    assert server.list_projection(server.Task, fields="title") == {"_id": 0, "title": 1, "id": 1, "created_at": 1}
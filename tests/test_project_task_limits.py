@@ -0,0 +1,13 @@
+import pytest
+
+import server
+
+
+def test_default_field_limits_fit_the_byte_budget(run):
+    run(server.startup_check_project_task_limits())
+
+
+def test_startup_rejects_field_limits_over_the_byte_budget(run, monkeypatch):
+    monkeypatch.setattr(server, "PROJECT_TASK_MAX_BYTES", 4096)
+    with pytest.raises(RuntimeError, match="PROJECT_TASK_MAX_BYTES=4096"):
+        run(server.startup_check_project_task_limits())
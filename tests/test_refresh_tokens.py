@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def refresh(run, token):
+    return run(server.refresh_access_token(server.RefreshRequest(refresh_token=token)))
+
+
+def assert_rejected(run, token):
+    with pytest.raises(HTTPException) as error:
+        refresh(run, token)
+    assert error.value.status_code == 401
+
+
+def test_refresh_rotates_the_token(db, run, student):
+    first = run(server.issue_tokens(student))["refresh_token"]
+
+    response = refresh(run, first)
+    second = response["refresh_token"]
+    assert second != first
+    assert server.decode_token(response["access_token"])["id"] == student.id
+    assert refresh(run, second)["refresh_token"] not in (first, second)
+    assert run(db.refresh_tokens.count_documents({"used_at": None})) == 1
+
+
+def test_concurrent_refreshes_get_the_same_successor(db, run, student):
+    first = run(server.issue_tokens(student))["refresh_token"]
+
+    # Two tabs, or a retry after a lost response, present the same token
+    successor = refresh(run, first)["refresh_token"]
+    assert refresh(run, first)["refresh_token"] == successor
+    assert refresh(run, successor)["refresh_token"]
+
+
+def test_reuse_after_the_grace_period_revokes_the_family(db, run, student):
+    first = run(server.issue_tokens(student))["refresh_token"]
+    successor = refresh(run, first)["refresh_token"]
+    late = datetime.utcnow() - timedelta(seconds=server.REFRESH_TOKEN_REUSE_GRACE_SECONDS + 1)
+    run(db.refresh_tokens.update_one({"token_hash": server.hash_refresh_token(first)}, {"$set": {"used_at": late}}))
+
+    assert_rejected(run, first)
+    assert_rejected(run, successor)
+    assert run(db.refresh_tokens.count_documents({})) == 0
+
+
+def test_reuse_after_the_successor_rotated_revokes_the_family(db, run, student):
+    first = run(server.issue_tokens(student))["refresh_token"]
+    successor = refresh(run, first)["refresh_token"]
+    latest = refresh(run, successor)["refresh_token"]
+
+    assert_rejected(run, first)
+    assert_rejected(run, latest)
+
+
+def test_other_families_survive_a_revocation(db, run, student):
+    stolen = run(server.issue_tokens(student))["refresh_token"]
+    other_device = run(server.issue_tokens(student))["refresh_token"]
+    refresh(run, refresh(run, stolen)["refresh_token"])
+
+    assert_rejected(run, stolen)
+    assert refresh(run, other_device)["refresh_token"]
+
+
+def test_expired_and_unknown_tokens_are_rejected(db, run, student):
+    token = run(server.issue_tokens(student))["refresh_token"]
+    run(db.refresh_tokens.update_many({}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}))
+
+    assert_rejected(run, token)
+    assert_rejected(run, "not-a-token")
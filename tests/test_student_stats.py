@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+import server
+
+
+def test_counters_are_backfilled_before_the_first_increment(db, run, student):
+    # Tasks written before the counters existed
+    run(db.tasks.insert_many([
+        server.Task(title=f"Old {i}", subject_id="history", student_id=student.id, completed=i < 3).dict()
+        for i in range(10)
+    ]))
+
+    run(server.create_task(server.TaskCreate(title="New", subject_id="history"), current_user=student))
+    old_task = run(db.tasks.find_one({"title": "Old 5"}))
+    run(server.update_task(old_task["id"], server.TaskUpdate(completed=True), current_user=student))
+
+    [summary] = run(server.get_student_summaries([student.id]))
+    assert summary["stats"]["total_tasks"] == 11
+    assert summary["stats"]["completed_tasks"] == 4
+    assert summary["stats"]["pending_tasks"] == 7
+    assert summary["stats"]["subjects"] == {"history": {"total": 11, "completed": 4}}
+
+
+@pytest.mark.parametrize("subject_id", ["", "a.b", "$set"])
+def test_subject_ids_must_be_plain_field_names(subject_id):
+    with pytest.raises(ValidationError):
+        server.TaskCreate(title="Essay", subject_id=subject_id, due_date=datetime(2026, 3, 2))
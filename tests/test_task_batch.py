@@ -0,0 +1,80 @@
+import json
+
+from mongomock_motor import AsyncMongoMockCollection
+
+import server
+
+
+def race_bulk_write(monkeypatch, concurrent_write):
+    """Runs concurrent_write once, after the batch has read its tasks but before it writes."""
+    bulk_write = AsyncMongoMockCollection.bulk_write
+    raced = []
+
+    async def racing_bulk_write(self, *args, **kwargs):
+        if not raced:
+            raced.append(True)
+            await concurrent_write()
+        return await bulk_write(self, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncMongoMockCollection, "bulk_write", racing_bulk_write)
+
+
+def test_batch_completion_racing_a_single_update_notifies_once(db, run, student, monkeypatch):
+    task = server.Task(title="Essay", subject_id="history", student_id=student.id)
+    run(db.tasks.insert_one(task.dict()))
+    run(server.rebuild_student_stats([student.id]))
+    race_bulk_write(monkeypatch, lambda: server.update_task(task.id, server.TaskUpdate(completed=True), current_user=student))
+
+    batch = server.TaskBatch(operations=[server.TaskBatchOperation(id=task.id, op="complete")])
+    response = json.loads(run(server.batch_update_tasks(batch, current_user=student)).body)
+
+    assert response["conflicts"] == [task.id]
+    assert response["updated"] == []
+    outbox = run(db.notification_outbox.find({}, {"_id": 0, "message": 1}).to_list(None))
+    assert [entry["message"] for entry in outbox] == ["Task completed: Essay"]
+    [summary] = run(server.get_student_summaries([student.id]))
+    assert summary["stats"]["completed_tasks"] == 1
+    assert summary["stats"]["total_tasks"] == 1
+
+
+def test_batch_reports_only_the_raced_task_as_a_conflict(db, run, student, monkeypatch):
+    tasks = [server.Task(title=f"Task {i}", subject_id="history", student_id=student.id) for i in range(3)]
+    run(db.tasks.insert_many([task.dict() for task in tasks]))
+    run(server.rebuild_student_stats([student.id]))
+    race_bulk_write(monkeypatch, lambda: server.delete_task(tasks[1].id, current_user=student))
+
+    batch = server.TaskBatch(operations=[
+        server.TaskBatchOperation(id=tasks[0].id, op="complete"),
+        server.TaskBatchOperation(id=tasks[1].id, op="complete"),
+        server.TaskBatchOperation(id=tasks[2].id, op="delete"),
+    ])
+    response = json.loads(run(server.batch_update_tasks(batch, current_user=student)).body)
+
+    assert [task["id"] for task in response["updated"]] == [tasks[0].id]
+    assert response["deleted"] == [tasks[2].id]
+    assert response["conflicts"] == [tasks[1].id]
+    outbox = run(db.notification_outbox.find({}, {"_id": 0, "message": 1}).to_list(None))
+    assert [entry["message"] for entry in outbox] == ["Task completed: Task 0"]
+    [summary] = run(server.get_student_summaries([student.id]))
+    assert (summary["stats"]["total_tasks"], summary["stats"]["completed_tasks"]) == (1, 1)
+
+
+def test_batch_applies_mixed_operations(db, run, student):
+    tasks = [server.Task(title=f"Task {i}", subject_id="history", student_id=student.id) for i in range(3)]
+    run(db.tasks.insert_many([task.dict() for task in tasks]))
+    run(server.rebuild_student_stats([student.id]))
+
+    batch = server.TaskBatch(operations=[
+        server.TaskBatchOperation(id=tasks[0].id, op="complete"),
+        server.TaskBatchOperation(id=tasks[1].id, op="complete"),
+        server.TaskBatchOperation(id=tasks[2].id, op="delete"),
+        server.TaskBatchOperation(id="missing", op="delete"),
+    ])
+    response = json.loads(run(server.batch_update_tasks(batch, current_user=student)).body)
+
+    assert response["conflicts"] == []
+    assert response["not_found"] == ["missing"]
+    outbox = run(db.notification_outbox.find({}, {"_id": 0, "message": 1, "details": 1}).to_list(None))
+    assert outbox == [{"message": "Completed 2 tasks", "details": ["Task 0", "Task 1"]}]
+    [summary] = run(server.get_student_summaries([student.id]))
+    assert (summary["stats"]["total_tasks"], summary["stats"]["completed_tasks"]) == (2, 2)
@@ -0,0 +1,27 @@
+import server
+
+
+def make_notification(user_id, title):
+    return server.Notification(user_id=user_id, title=title, message=title, type="task_update").dict()
+
+
+def test_new_accounts_count_every_notification(db, run):
+    parent = server.User(email="pat@example.com", name="Pat", role="parent", hashed_password="x")
+    run(server.create_accounts([parent]))
+    assert run(db.notification_counters.find_one({"user_id": parent.id}))["unread"] == 0
+
+    run(server.store_notifications([make_notification(parent.id, "Essay done")]))
+    assert run(server.get_unread_notification_count(parent.id)) == 1
+
+
+def test_backfill_counts_unread_notifications_of_existing_accounts(db, run):
+    parent = server.User(email="pat@example.com", name="Pat", role="parent", hashed_password="x")
+    run(db.users.insert_one(parent.dict()))
+    read = make_notification(parent.id, "Old")
+    read["read"] = True
+    run(db.notifications.insert_many([make_notification(parent.id, "Essay done"), read]))
+
+    assert run(server.backfill_unread_counts()) == 1
+    run(server.store_notifications([make_notification(parent.id, "Quiz done")]))
+    assert run(server.get_unread_notification_count(parent.id)) == 2
+    assert run(server.backfill_unread_counts()) == 0